@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+from math import ceil, sqrt
+
+# Encodings of the at-most-one constraint into CNF clauses
+# every encoding takes the literals and the pool of variables (pysat IDPool) for the auxiliary variables
+
+
+# Lists shorter than this are always encoded pairwise, the auxiliary variables don't pay off there
+PAIRWISE_LIMIT = 5
+
+
+# Every pair of literals can't be true at once, O(n^2) clauses and no auxiliary variables
+def pairwise(literals, pool):
+    clauses = []
+    for i in range(len(literals) - 1):
+        for j in range(i + 1, len(literals)):
+            clauses.append([-literals[i], -literals[j]])
+    return clauses
+
+
+# Sequential counter (Sinz), O(n) clauses and n - 1 auxiliary variables
+# the auxiliary variable s_i is true when some of the first i literals is true
+def sequential_counter(literals, pool):
+    if len(literals) <= PAIRWISE_LIMIT:
+        return pairwise(literals, pool)
+
+    clauses = []
+    counters = [pool.id() for _ in range(len(literals) - 1)]
+    clauses.append([-literals[0], counters[0]])
+    for i in range(1, len(literals) - 1):
+        clauses.append([-literals[i], counters[i]])
+        clauses.append([-counters[i - 1], counters[i]])
+        clauses.append([-literals[i], -counters[i - 1]])
+    clauses.append([-literals[-1], -counters[-1]])
+    return clauses
+
+
+# Commander encoding (Klieber, Kwon), the literals are split into groups of the given size
+# and each group has a commander which is true when some literal of the group is true
+def commander(literals, pool, group_size=3):
+    if len(literals) <= PAIRWISE_LIMIT:
+        return pairwise(literals, pool)
+
+    clauses = []
+    commanders = []
+    for i in range(0, len(literals), group_size):
+        group = literals[i:i + group_size]
+        cmd = pool.id()
+        commanders.append(cmd)
+        clauses.extend(pairwise(group, pool))
+        for lit in group:
+            clauses.append([-lit, cmd])
+    clauses.extend(commander(commanders, pool, group_size))
+    return clauses
+
+
+# Product encoding (Chen), the literals are placed into a p x q grid and each of them
+# implies its row and column variable, at most one row and one column can be chosen
+def product(literals, pool):
+    if len(literals) <= PAIRWISE_LIMIT:
+        return pairwise(literals, pool)
+
+    p = ceil(sqrt(len(literals)))
+    q = ceil(len(literals) / p)
+    rows = [pool.id() for _ in range(p)]
+    columns = [pool.id() for _ in range(q)]
+
+    clauses = []
+    for i, lit in enumerate(literals):
+        clauses.append([-lit, rows[i // q]])
+        clauses.append([-lit, columns[i % q]])
+    clauses.extend(product(rows, pool))
+    clauses.extend(product(columns, pool))
+    return clauses
+
+
+ENCODINGS = {
+    "pairwise": pairwise,
+    "sequential": sequential_counter,
+    "commander": commander,
+    "product": product,
+}
+
+
+# Clauses which allow at most one of the literals to be true using the chosen encoding
+def at_most_one(literals, pool, encoding="pairwise"):
+    if encoding not in ENCODINGS:
+        raise ValueError("Unsupported at-most-one encoding {}".format(encoding))
+    return ENCODINGS[encoding](literals, pool)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import numpy
+
+# Encodings of the color of an element (node or edge) into CNF variables, the element x has width
+# variables x * width + 1, ..., x * width + width and its color c (1..upper_bound) is a conjunction of
+# literals (cube) of them. Each function works on all the elements at once, base are the numbers
+# x * width of the elements.
+# - direct: a variable for each color, width upper_bound, at-least-one and at-most-one clauses per element
+# - order: the variable c - 1 means that the color is at least c, width upper_bound - 1, a chain of implications
+# - log: the binary digits of the color - 1, width ceil(log2(upper_bound)), the values above upper_bound forbidden
+
+ENCODINGS = ["direct", "order", "log", "auto"]
+
+# The direct encoding propagates the best, auto uses it unless the formula would be large
+AUTO_DIRECT_LIMIT = 16
+# Dense graphs with many colors have the largest formulas, auto encodes them by the log encoding
+AUTO_LOG_DENSITY = 0.5
+
+
+# Encoding for the graph by its max degree and density
+def choose(max_degree, density):
+    if max_degree + 2 <= AUTO_DIRECT_LIMIT:
+        return "direct"
+    return "log" if density >= AUTO_LOG_DENSITY else "order"
+
+
+# Amount of variables of each element
+def width(encoding, upper_bound):
+    if encoding == "order":
+        return upper_bound - 1
+    if encoding == "log":
+        return max(1, (upper_bound - 1).bit_length())
+    return upper_bound
+
+
+# Literals of the elements which are all true when the element has the color c, a row for each element
+def cube(encoding, base, upper_bound, c):
+    base = base[:, None]
+    if encoding == "order":
+        if c == 1:
+            return -(base + 1)
+        if c == upper_bound:
+            return base + c - 1
+        return numpy.hstack((base + c - 1, -(base + c)))
+    if encoding == "log":
+        digits = numpy.arange(width(encoding, upper_bound), dtype=numpy.int64)
+        signs = numpy.where(((c - 1) >> digits) & 1, 1, -1)
+        return (base + digits + 1) * signs
+    return base + c
+
+
+# Clauses of each element by themselves, for the order and log encodings (the direct one is in total_cnf)
+def element_batches(encoding, base, upper_bound):
+    if encoding == "order":
+        # The color at least c + 1 is also at least c
+        for c in range(2, upper_bound):
+            yield numpy.stack((-(base + c), base + c - 1), axis=1)
+    elif encoding == "log":
+        # The values without a color
+        for c in range(upper_bound + 1, (1 << width(encoding, upper_bound)) + 1):
+            yield -cube(encoding, base, upper_bound, c)
+
+
+# Clauses that the pairs of elements don't have the same color, for each of the colors
+def difference_batches(encoding, first, second, upper_bound, colors):
+    for c in colors:
+        yield numpy.hstack((-cube(encoding, first, upper_bound, c), -cube(encoding, second, upper_bound, c)))
+
+
+# Colors (0..upper_bound - 1) of the elements from the values of their variables (elements x width booleans),
+# an element without a color (direct encoding only) gets -2
+def decode(encoding, values, upper_bound):
+    if encoding == "order":
+        return values.sum(axis=1)
+    if encoding == "log":
+        return (values.astype(numpy.int64) << numpy.arange(values.shape[1], dtype=numpy.int64)).sum(axis=1)
+    return numpy.where(values.any(axis=1), values.argmax(axis=1), -2)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+import time
+
+# Search engine for total coloring as a CSP, the variables are nodes and edges numbered 0..n-1,
+# their domains of colors are bitsets and the constraints are cliques of variables which must all differ.
+# The engine uses MRV with DSATUR tie breaking, forward checking with pigeonhole check of the cliques
+# and undoes the changes of domains by trail when backtracking.
+
+
+class CliqueSolver:
+    def __init__(self, variables_count: int, colors: int, domains=None, interchangeable_from=None):
+        self.colors = colors
+        self.initial = list(domains) if domains is not None else [(1 << colors) - 1] * variables_count
+        # Colors from interchangeable_from up are symmetric, only the lowest unused of them is tried
+        self.interchangeable_from = interchangeable_from
+        self.cliques = []
+        self.var_cliques = [[] for _ in range(variables_count)]
+        self.neighbors = [set() for _ in range(variables_count)]
+
+        self.domains = []
+        self.used = []
+        self.trail = []
+        self.queue = []
+        self.timed_out = False
+        # Search statistics of the last solve, the values tried and the failed propagations
+        self.decisions = 0
+        self.conflicts = 0
+
+    # Adds the constraint that all the variables must have a different color
+    def add_clique(self, clique):
+        index = len(self.cliques)
+        self.cliques.append(list(clique))
+        for x in clique:
+            self.var_cliques[x].append(index)
+            self.neighbors[x].update(clique)
+            self.neighbors[x].discard(x)
+
+    # Changes the domain and remembers the old one, the assigned variables are queued for propagation
+    def set_domain(self, x, domain):
+        self.trail.append((x, self.domains[x]))
+        self.domains[x] = domain
+        if domain & (domain - 1) == 0:
+            self.used[domain.bit_length() - 1] += 1
+            self.queue.append(x)
+
+    # Restores the domains to the state when the trail had the given length
+    def undo(self, mark):
+        while len(self.trail) > mark:
+            x, domain = self.trail.pop()
+            current = self.domains[x]
+            if current & (current - 1) == 0 and domain & (domain - 1) != 0:
+                self.used[current.bit_length() - 1] -= 1
+            self.domains[x] = domain
+        self.queue.clear()
+
+    # Removes the colors of the assigned variables from their neighbors, fails when a domain gets empty
+    # or when a clique has more unassigned variables than colors left for them (pigeonhole). The cliques
+    # with as many variables as colors must use every color, so a color which can be used only by one
+    # variable of such clique is assigned to it
+    def propagate(self, touched=None):
+        full = (1 << self.colors) - 1
+        touched = set() if touched is None else set(touched)
+        while True:
+            while self.queue:
+                x = self.queue.pop()
+                bit = self.domains[x]
+                touched.update(self.var_cliques[x])
+                for y in self.neighbors[x]:
+                    domain = self.domains[y]
+                    if domain & bit:
+                        domain &= ~bit
+                        if domain == 0:
+                            self.queue.clear()
+                            return False
+                        self.set_domain(y, domain)
+                        touched.update(self.var_cliques[y])
+
+            for index in touched:
+                clique = self.cliques[index]
+                union = 0
+                unassigned = 0
+                once = 0
+                twice = 0
+                for y in clique:
+                    domain = self.domains[y]
+                    twice |= once & domain
+                    once |= domain
+                    if domain & (domain - 1):
+                        union |= domain
+                        unassigned += 1
+                if unassigned > bin(union).count("1"):
+                    self.queue.clear()
+                    return False
+
+                if len(clique) == self.colors:
+                    if once != full:
+                        self.queue.clear()
+                        return False
+                    single = once & ~twice
+                    while single:
+                        bit = single & -single
+                        single &= ~bit
+                        for y in clique:
+                            domain = self.domains[y]
+                            if domain & bit and domain != bit:
+                                self.set_domain(y, bit)
+                                break
+            touched = set()
+            if not self.queue:
+                return True
+
+    # Unassigned variable with the smallest domain, ties are broken by the largest degree
+    def select(self):
+        best = None
+        best_key = None
+        for x, domain in enumerate(self.domains):
+            if domain & (domain - 1):
+                key = (bin(domain).count("1"), -len(self.neighbors[x]))
+                if best_key is None or key < best_key:
+                    best = x
+                    best_key = key
+        return best
+
+    # Colors which are worth trying for the variable
+    def values(self, x):
+        domain = self.domains[x]
+        if self.interchangeable_from is not None:
+            c = self.interchangeable_from
+            while c < self.colors - 1 and self.used[c] > 0:
+                c += 1
+            domain &= (1 << (c + 1)) - 1
+        return domain
+
+    # Finds the colors of all variables or returns None if there is no solution
+    # or the deadline (time.monotonic) has passed, which is then marked by timed_out
+    def solve(self, deadline=None):
+        self.timed_out = False
+        self.decisions = 0
+        self.conflicts = 0
+        self.domains = list(self.initial)
+        self.used = [0] * self.colors
+        self.trail = []
+        self.queue = []
+        for x, domain in enumerate(self.domains):
+            if domain == 0:
+                return None
+            if domain & (domain - 1) == 0:
+                self.used[domain.bit_length() - 1] += 1
+                self.queue.append(x)
+        if not self.propagate(range(len(self.cliques))):
+            return None
+
+        # Each frame holds the variable, the colors not tried yet and the trail length before the choice
+        stack = []
+        steps = 0
+        x = self.select()
+        while x is not None:
+            stack.append([x, self.values(x), len(self.trail)])
+            while True:
+                steps += 1
+                if deadline is not None and steps % 256 == 0 and time.monotonic() >= deadline:
+                    self.timed_out = True
+                    return None
+                frame = stack[-1]
+                self.undo(frame[2])
+                if frame[1] == 0:
+                    stack.pop()
+                    if not stack:
+                        return None
+                    continue
+                bit = frame[1] & -frame[1]
+                frame[1] &= ~bit
+                self.set_domain(frame[0], bit)
+                self.decisions += 1
+                if self.propagate():
+                    break
+                self.conflicts += 1
+            x = self.select()
+
+        return [domain.bit_length() - 1 for domain in self.domains]
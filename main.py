@@ -1,39 +1,186 @@
+import time
+
+# The imports of the modules needed by all commands, the solvers and the plotting stack are imported
+# by total_modes when they are used
+started = time.perf_counter()
 from total_tests import *
 from total_experiments import run_experiments
+from total_benchmark import run_benchmark
+from total_batch import run_batch
+from at_most_one import ENCODINGS
+import color_encoding
+from total_cache import ColoringCache
+from total_stats import Stats
+import total_modes
+import os
 import sys
+STARTUP_TIME = time.perf_counter() - started
 
 
 def main():
     # Running experiments
-    if len(sys.argv) == 2 and sys.argv[1] == '--experiments':
-        run_experiments()
+    if len(sys.argv) > 1 and sys.argv[1] == '--experiments':
+        options = {}
+        modes = []
+        for arg in sys.argv[2:]:
+            if arg.startswith('--timeout='):
+                options["timeout"] = float(arg[len('--timeout='):])
+            elif arg.startswith('--workers='):
+                options["workers"] = int(arg[len('--workers='):])
+            elif arg.startswith('--results='):
+                options["results_path"] = arg[len('--results='):]
+            elif arg.startswith('--plots='):
+                options["plots_dir"] = arg[len('--plots='):]
+            elif arg.startswith('--seed='):
+                options["seed"] = int(arg[len('--seed='):])
+            elif arg.startswith('--encoding='):
+                options["encoding"] = arg[len('--encoding='):]
+            else:
+                modes.append(arg)
+        if not run_experiments(modes or None, **options):
+            print("Experiments failed")
+            sys.exit(1)
+
+    # Running benchmark
+    elif len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        options = {}
+        modes = []
+        for arg in sys.argv[2:]:
+            if arg.startswith('--repeats='):
+                options["repeats"] = int(arg[len('--repeats='):])
+            elif arg.startswith('--baseline='):
+                options["baseline"] = arg[len('--baseline='):]
+            elif arg.startswith('--save='):
+                options["save"] = arg[len('--save='):]
+            elif arg.startswith('--seed='):
+                options["seed"] = int(arg[len('--seed='):])
+            elif arg.startswith('--timeout='):
+                options["timeout"] = float(arg[len('--timeout='):])
+            elif arg.startswith('--amo='):
+                options["amo"] = arg[len('--amo='):]
+            elif arg.startswith('--encoding='):
+                options["encoding"] = arg[len('--encoding='):]
+            elif arg == '--symmetry':
+                options["symmetry"] = True
+            elif arg == '--precedence':
+                options["symmetry"] = True
+                options["precedence"] = True
+            elif arg == '--heuristic':
+                options["heuristic"] = True
+            else:
+                modes.append(arg)
+        if not run_benchmark(modes or None, **options):
+            print("Benchmark failed")
+            sys.exit(1)
+
+    # Coloring graphs from files or stdin
+    elif len(sys.argv) > 1 and sys.argv[1] == '--batch':
+        options = {}
+        sources = []
+        for arg in sys.argv[2:]:
+            if arg.startswith('--mode='):
+                options["mode"] = arg[len('--mode='):]
+            elif arg.startswith('--format='):
+                options["fmt"] = arg[len('--format='):]
+            elif arg.startswith('--workers='):
+                options["workers"] = int(arg[len('--workers='):])
+            elif arg.startswith('--output='):
+                options["output"] = arg[len('--output='):]
+            elif arg.startswith('--timeout='):
+                options["timeout"] = float(arg[len('--timeout='):])
+            elif arg.startswith('--amo='):
+                options["amo"] = arg[len('--amo='):]
+            elif arg.startswith('--encoding='):
+                options["encoding"] = arg[len('--encoding='):]
+            elif arg == '--symmetry':
+                options["symmetry"] = True
+            elif arg == '--precedence':
+                options["symmetry"] = True
+                options["precedence"] = True
+            elif arg == '--heuristic':
+                options["heuristic"] = True
+            else:
+                sources.append(arg)
+        if not run_batch(sources, **options):
+            sys.exit(1)
 
     # Running validation tests
     else:
         to_run = []
         draw = False
+        stats = False
+        options = {}
 
-        # Default setup
-        if len(sys.argv) == 1:
-            to_run = ["SAT", "CSP", "CSP_iterative", "SAT_iterative"]
         # Custom setup
-        else:
+        if len(sys.argv) > 1:
             for i in range(1, len(sys.argv)):
                 if sys.argv[i] == '--draw':
                     draw = True
+                elif sys.argv[i] == '--symmetry':
+                    options["symmetry"] = True
+                elif sys.argv[i] == '--precedence':
+                    options["symmetry"] = True
+                    options["precedence"] = True
+                elif sys.argv[i] == '--heuristic':
+                    options["heuristic"] = True
+                elif sys.argv[i] == '--families':
+                    options["families"] = True
+                elif sys.argv[i] == '--stats':
+                    stats = True
+                elif sys.argv[i] == '--decompose':
+                    options["decompose"] = True
+                elif sys.argv[i].startswith('--workers='):
+                    options["workers"] = int(sys.argv[i][len('--workers='):])
+                elif sys.argv[i].startswith('--timeout='):
+                    options["timeout"] = float(sys.argv[i][len('--timeout='):])
+                elif sys.argv[i].startswith('--cnf='):
+                    options["cnf_dir"] = sys.argv[i][len('--cnf='):]
+                    os.makedirs(options["cnf_dir"], exist_ok=True)
+                elif sys.argv[i].startswith('--cache='):
+                    options["cache"] = ColoringCache(sys.argv[i][len('--cache='):])
+                elif sys.argv[i].startswith('--encoding='):
+                    options["encoding"] = sys.argv[i][len('--encoding='):]
+                    if options["encoding"] not in color_encoding.ENCODINGS:
+                        print("Unsupported color encoding")
+                        return
+                elif sys.argv[i].startswith('--amo='):
+                    options["amo"] = sys.argv[i][len('--amo='):]
+                    if options["amo"] not in ENCODINGS:
+                        print("Unsupported at-most-one encoding")
+                        return
                 else:
                     to_run.append(sys.argv[i])
 
+        # Default setup
+        if not to_run:
+            to_run = ["SAT", "CSP", "CSP_iterative", "SAT_iterative"]
+
         for mode in to_run:
-            if mode == "CSP" or mode == "SAT" or mode == "CSP_iterative" or mode == "SAT_iterative":
-                if run_tests(mode, draw):
+            if mode in total_modes.MODES:
+                if stats:
+                    options["stats"] = Stats()
+                if run_tests(mode, draw, **options):
                     print("Tests passed.")
                 else:
                     print("Tests failed.")
+                if stats:
+                    print("Statistics of {}:\n{}".format(mode, options["stats"].report()))
             else:
                 print("Unsupported mode")
                 return
 
+        if "cache" in options:
+            print("Cache hits: {}, misses: {}".format(options["cache"].hits, options["cache"].misses))
+            options["cache"].close()
+
 
 if __name__ == '__main__':
-    main()
+    # With --imports the startup time and the lazy imports are reported to stderr
+    imports = '--imports' in sys.argv
+    if imports:
+        sys.argv.remove('--imports')
+    try:
+        main()
+    finally:
+        if imports:
+            print(total_modes.import_report(STARTUP_TIME), file=sys.stderr)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+from total_tests import solver_for, verify_total_coloring
+import collections
+import json
+import multiprocessing
+import networkx
+import sys
+import time
+import total_modes
+
+# Batch coloring of graphs read as a stream from files or stdin, each graph is colored by the chosen mode
+# and its result is written as a line of JSON as soon as it is known. At most a bounded window of graphs
+# is read ahead of the written results, so the input of any size is never loaded at once.
+#
+# Formats: edge lists (a line "u v" per edge, a single node on a line is an isolated vertex, the graphs
+# are separated by empty lines and "#" starts a comment), graph6 and sparse6 (a graph per line)
+# and GraphML (a graph per file).
+
+# Formats by the extension of the file, other files are read as edge lists
+EXTENSIONS = {".g6": "graph6", ".s6": "sparse6", ".graphml": "graphml"}
+
+# Errors of reading and parsing a source, reported as the result of the source
+READ_ERRORS = (OSError, ValueError, SyntaxError, networkx.NetworkXError)
+
+# Graphs read ahead for each worker
+WINDOW_PER_WORKER = 4
+
+
+# Node read from the edge list, numbers are kept as integers
+def parse_node(token):
+    try:
+        return int(token)
+    except ValueError:
+        return token
+
+
+# Graph from the lines of the edge list, a line with more than two nodes is an error
+def edge_list_graph(lines):
+    graph = networkx.Graph()
+    for line in lines:
+        tokens = line.split()
+        if len(tokens) > 2:
+            raise ValueError("Expected one or two nodes on the line {!r}".format(line))
+        if len(tokens) == 1:
+            graph.add_node(parse_node(tokens[0]))
+        else:
+            graph.add_edge(parse_node(tokens[0]), parse_node(tokens[1]))
+    return graph
+
+
+# Graph from the lines of the edge list or the error when the lines can't be parsed
+def parse_edge_list(lines):
+    try:
+        return edge_list_graph(lines)
+    except READ_ERRORS as e:
+        return e
+
+
+# Graphs of the edge list stream separated by empty lines, a block which can't be parsed yields its error
+def read_edge_lists(stream):
+    lines = []
+    for line in stream:
+        line = line.split("#", 1)[0].strip()
+        if line:
+            lines.append(line)
+        elif lines:
+            yield parse_edge_list(lines)
+            lines = []
+    if lines:
+        yield parse_edge_list(lines)
+
+
+# Graph of the graph6 or sparse6 line, sparse6 lines start with ":", or the error when it can't be parsed
+def parse_graph6(line):
+    try:
+        data = line.encode("ascii")
+        if data.startswith(b">>sparse6<<") or data.startswith(b":"):
+            return networkx.from_sparse6_bytes(data)
+        return networkx.from_graph6_bytes(data)
+    except READ_ERRORS as e:
+        return e
+
+
+# Graphs of the graph6 or sparse6 stream, one per line, a line which can't be parsed yields its error
+def read_graph6(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield parse_graph6(line)
+
+
+# Format of the source, "-" is stdin which is read as edge lists unless the format is given
+def source_format(source, fmt=None):
+    if fmt is not None:
+        return fmt
+    for extension, name in EXTENSIONS.items():
+        if source.endswith(extension):
+            return name
+    return "edgelist"
+
+
+# Reads the graphs from the sources one by one, yields their names and the graphs, a graph which can't be
+# parsed yields its error instead and the reading goes on with the next graph, a source which can't be
+# opened or read yields the error in place of its next graph and the reading goes on with the next source
+def read_graphs(sources, fmt=None):
+    for source in sources:
+        name = "stdin" if source == "-" else source
+        count = 0
+        try:
+            current = source_format(source, fmt)
+            stream = sys.stdin if source == "-" else open(source)
+            try:
+                if current == "graphml":
+                    graphs = [networkx.read_graphml(stream.buffer if source == "-" else source)]
+                elif current in ("graph6", "sparse6"):
+                    graphs = read_graph6(stream)
+                elif current == "edgelist":
+                    graphs = read_edge_lists(stream)
+                else:
+                    raise ValueError("Unsupported format {}".format(current))
+                for graph in graphs:
+                    count += 1
+                    yield "{}:{}".format(name, count), graph if isinstance(graph, Exception) else networkx.Graph(graph)
+            finally:
+                if source != "-":
+                    stream.close()
+        except READ_ERRORS as e:
+            yield "{}:{}".format(name, count + 1), e
+
+
+# Colors the graph by the mode and returns its result, the failures are returned as the error
+def color_graph(name, graph, mode, options):
+    if isinstance(graph, Exception):
+        return {"name": name, "error": "{}: {}".format(type(graph).__name__, graph)}
+    result = {"name": name, "nodes": graph.number_of_nodes(), "edges": graph.number_of_edges()}
+    if networkx.number_of_selfloops(graph) > 0:
+        return dict(result, error="Loops can't be totally colored")
+
+    start = time.perf_counter()
+    try:
+        colors = solver_for(mode, **options)(graph)
+    except Exception as e:
+        return dict(result, error="{}: {}".format(type(e).__name__, e))
+    elapsed = time.perf_counter() - start
+
+    error = verify_total_coloring(graph, None, colors)
+    if error:
+        return dict(result, error=error)
+    if "lower_bound" in graph.graph:
+        result["lower_bound"] = graph.graph["lower_bound"]
+    return dict(result, colors=colors, status=graph.graph.get("status", "optimal"), elapsed=elapsed,
+                node_colors=[[u, graph.nodes[u]["color"]] for u in graph.nodes],
+                edge_colors=[[u, v, graph.edges[u, v]["color"]] for u, v in graph.edges])
+
+
+# Results of the graphs in the input order, colored in up to workers processes
+def color_graphs(graphs, mode, options, workers=1):
+    if workers <= 1:
+        for name, graph in graphs:
+            yield color_graph(name, graph, mode, options)
+        return
+
+    # The graphs are submitted only while the window has room, so the input is read as the results are written
+    window = collections.deque()
+    with multiprocessing.Pool(workers) as pool:
+        for name, graph in graphs:
+            window.append(pool.apply_async(color_graph, (name, graph, mode, options)))
+            if len(window) >= workers * WINDOW_PER_WORKER:
+                yield window.popleft().get()
+        while window:
+            yield window.popleft().get()
+
+
+# Colors the graphs of the sources ("-" for stdin) and writes the results as JSON Lines to the output,
+# the options are passed to the solver, returns False if some graph failed
+def run_batch(sources, mode="SAT", fmt=None, workers=1, output=None, **options) -> bool:
+    if mode not in total_modes.MODES:
+        print("Unsupported mode {}".format(mode), file=sys.stderr)
+        return False
+    if total_modes.MODES[mode].parallel:
+        # The parallel modes (portfolio) run their engines in their own processes, which the pool processes
+        # can't start
+        workers = 1
+
+    out = sys.stdout if output is None else open(output, "w")
+    failed = 0
+    try:
+        for result in color_graphs(read_graphs(sources or ["-"], fmt), mode, options, workers):
+            failed += "error" in result
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    finally:
+        if output is not None:
+            out.close()
+    return failed == 0
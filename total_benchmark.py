@@ -0,0 +1,162 @@
+from total_tests import solver_for, verify_total_coloring
+from total_experiments import experiment_jobs, create_graph
+from total_stats import Stats
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import resource
+import statistics
+import time
+import tracemalloc
+
+# Benchmark of the modes on the graphs of the experiments with fixed seeds, every case is run repeatedly
+# and summarized by the median and the interquartile range of the time, the medians of the phases
+# and the peak memory (of the whole process and of the Python heap). The results can be saved and compared
+# with a baseline saved before.
+
+# Relative slowdown of the median reported as regression
+THRESHOLD = 0.2
+# Slowdowns below this amount of seconds are considered noise
+MIN_DIFFERENCE = 0.005
+
+
+# Name of the case in the results
+def case_name(job):
+    parts = [job["experiment"], str(job["size"])]
+    if job["density"] is not None:
+        parts.append("density {}".format(job["density"]))
+    if job["seed"] is not None:
+        parts.append("seed {}".format(job["seed"]))
+    return "{} ({}) {}".format(parts[0], ", ".join(parts[1:]), job["mode"])
+
+
+# Median and the lower and upper quartile of the values
+def summarize(values):
+    if len(values) < 2:
+        return values[0], values[0], values[0]
+    quartiles = statistics.quantiles(values, n=4, method="inclusive")
+    return statistics.median(values), quartiles[0], quartiles[2]
+
+
+# Peak resident memory of the process in bytes, VmHWM of Linux belongs to the memory of the process itself,
+# while ru_maxrss (used elsewhere, in kilobytes) also keeps the peak of the process which started it
+def peak_resident_memory():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# Growth of the peak resident memory of a fresh process while it colors the graph of the case, in bytes,
+# it includes the native memory of the solvers (the clause database of SAT) which tracemalloc doesn't see
+def process_peak_memory(job, options):
+    name, graph = create_graph(job)
+    solve = solver_for(job["mode"], **options)
+    before = peak_resident_memory()
+    solve(graph)
+    return peak_resident_memory() - before
+
+
+# Runs the case repeatedly and measures it, after an untimed warmup run which takes the lazy imports
+# and the other costs of the first call
+def measure(job, repeats, options):
+    name, graph = create_graph(job)
+    solver_for(job["mode"], **options)(graph.copy())
+    times = []
+    phases = {}
+    colors = None
+    error = None
+    for _ in range(repeats):
+        stats = Stats()
+        solve = solver_for(job["mode"], stats=stats, **options)
+        colored = graph.copy()
+        start = time.perf_counter()
+        colors = solve(colored)
+        times.append(time.perf_counter() - start)
+        for phase, elapsed in stats.phases.items():
+            phases.setdefault(phase, []).append(elapsed)
+
+        expected = job["expected"] if colored.graph.get("status") == "optimal" else None
+        error = error or verify_total_coloring(colored, expected, colors)
+
+    # Peak memory is measured by separate runs, tracing the allocations slows the solver down and the process
+    # started for the case has no memory peak of the previous cases
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        peak_memory = executor.submit(process_peak_memory, job, options).result()
+    tracemalloc.start()
+    solver_for(job["mode"], **options)(graph.copy())
+    python_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    median, lower, upper = summarize(times)
+    return {
+        "median": median,
+        "iqr": upper - lower,
+        "quartiles": [lower, upper],
+        "phases": {phase: statistics.median(values) for phase, values in phases.items()},
+        "peak_memory": peak_memory,
+        "python_memory": python_memory,
+        "colors": colors,
+        "error": error,
+    }
+
+
+# Quartiles of the result, the baselines saved without them use the median and the interquartile range
+def quartiles(result):
+    if "quartiles" in result:
+        return result["quartiles"]
+    return [result["median"] - result["iqr"] / 2, result["median"] + result["iqr"] / 2]
+
+
+# Compares the results with the baseline, returns the names of the cases whose median got slower
+# by more than the threshold and whose interquartile range lies entirely above the one of the baseline
+def compare(results, baseline):
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        difference = result["median"] - base["median"]
+        separated = quartiles(result)[0] > quartiles(base)[1]
+        if separated and difference > max(THRESHOLD * base["median"], MIN_DIFFERENCE):
+            print("Regression: {}: {:.4f}s -> {:.4f}s (+{:.0f}%)".format(
+                name, base["median"], result["median"], 100 * difference / max(base["median"], 1e-9)))
+            regressions.append(name)
+    return regressions
+
+
+# Runs the benchmark of the modes, the results are saved to the save file and compared with
+# the baseline file, returns False if some case failed or got slower than in the baseline
+def run_benchmark(modes=None, repeats=5, baseline=None, save=None, seed=0, **options) -> bool:
+    if modes is None:
+        modes = ["CSP", "SAT", "CSP_iterative", "SAT_iterative"]
+
+    results = {}
+    failed = False
+    for job in experiment_jobs(modes, seed):
+        name = case_name(job)
+        result = measure(job, repeats, options)
+        results[name] = result
+        phases = ", ".join("{} {:.4f}s".format(phase, elapsed) for phase, elapsed in sorted(result["phases"].items()))
+        print("{}: median {:.4f}s, IQR {:.4f}s, peak memory {:.1f} MB, Python heap {:.1f} MB ({})".format(
+            name, result["median"], result["iqr"], result["peak_memory"] / 1e6, result["python_memory"] / 1e6,
+            phases))
+        if result["error"]:
+            print("Failed: {}".format(result["error"]))
+            failed = True
+
+    if save is not None:
+        with open(save, "w") as f:
+            json.dump({"repeats": repeats, "seed": seed, "options": options, "results": results}, f, indent=1)
+
+    if baseline is not None:
+        with open(baseline) as f:
+            stored = json.load(f)
+        regressions = compare(results, stored["results"])
+        print("{} of {} cases slower than the baseline".format(len(regressions), len(results)))
+        failed = failed or bool(regressions)
+    return not failed
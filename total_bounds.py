@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+import numpy
+from total_graph import TotalGraph
+
+# Lower bounds of the total chromatic index which are checked before the solvers, every graph needs
+# max degree + 1 colors and the bound is raised to max degree + 2 when one of the sufficient conditions
+# is met by a component with the max degree of the whole graph:
+# - known families, complete graphs on even vertices, complete bipartite graphs with equal sides
+#   and cycles with length not divisible by 3
+# - regular graphs, with max degree + 1 colors every node sees each color once (on itself or on one of its
+#   edges), so each color class covers all nodes by its nodes and a matching and has as many nodes
+#   as the graph modulo 2. The classes must share the n nodes while each of them is independent
+# - counting, a color class (total independent set) has at most alpha + (n - alpha) / 2 elements
+# The independence number alpha is bounded by the degrees and for regular graphs by Hoffman's ratio bound.
+
+# Largest component for which the eigenvalues of the adjacency matrix are computed
+HOFFMAN_LIMIT = 600
+
+
+# Numbers of the components of the nodes
+def component_labels(total):
+    labels = numpy.full(total.n, -1, dtype=numpy.int64)
+    offsets = total.offsets.tolist()
+    adjacent = total.adjacent.tolist()
+    count = 0
+    for start in range(total.n):
+        if labels[start] != -1:
+            continue
+        labels[start] = count
+        stack = [start]
+        while stack:
+            u = stack.pop()
+            for w in adjacent[offsets[u]:offsets[u + 1]]:
+                if labels[w] == -1:
+                    labels[w] = count
+                    stack.append(w)
+        count += 1
+    return labels, count
+
+
+# Components of the graph as TotalGraphs, only the components with the given max degree
+def components(total, max_degree):
+    labels, count = component_labels(total)
+    wanted = numpy.zeros(count, dtype=bool)
+    wanted[labels[total.degree == max_degree]] = True
+
+    edge_labels = labels[total.edges[:, 0]]
+    order = numpy.argsort(edge_labels, kind="stable")
+    bounds = numpy.searchsorted(edge_labels[order], numpy.arange(count + 1))
+    for c in numpy.flatnonzero(wanted).tolist():
+        nodes = numpy.flatnonzero(labels == c)
+        numbers = numpy.full(total.n, -1, dtype=numpy.int64)
+        numbers[nodes] = numpy.arange(len(nodes))
+        yield TotalGraph(len(nodes), numbers[total.edges[order[bounds[c]:bounds[c + 1]]]])
+
+
+# Sides of the connected bipartite graph or None
+def bipartition(total):
+    side = numpy.full(total.n, -1, dtype=numpy.int64)
+    offsets = total.offsets.tolist()
+    adjacent = total.adjacent.tolist()
+    side[0] = 0
+    stack = [0]
+    while stack:
+        u = stack.pop()
+        for w in adjacent[offsets[u]:offsets[u + 1]]:
+            if side[w] == -1:
+                side[w] = 1 - side[u]
+                stack.append(w)
+            elif side[w] == side[u]:
+                return None
+    return side
+
+
+# Family of the connected graph which needs max degree + 2 colors or None
+def type2_family(total):
+    n, m = total.n, total.m
+    if m == n * (n - 1) // 2:
+        return "complete graph on even vertices" if n % 2 == 0 else None
+    if total.max_degree == 2 and (total.degree == 2).all():
+        return "cycle of length not divisible by 3" if n % 3 != 0 else None
+    side = bipartition(total)
+    if side is not None:
+        a = int(side.sum())
+        if a * 2 == n and m == a * a:
+            return "complete bipartite graph with equal sides"
+    return None
+
+
+# Upper bound of the independence number of the connected graph
+def independence_bound(total):
+    n, m, d = total.n, total.m, total.max_degree
+    # Every edge has an endpoint outside the independent set
+    alpha = n - -(-m // d) if d > 0 else n
+    if (total.degree == d).all() and d > 0 and n <= HOFFMAN_LIMIT:
+        adjacency = numpy.zeros((n, n))
+        adjacency[total.edges[:, 0], total.edges[:, 1]] = 1
+        adjacency[total.edges[:, 1], total.edges[:, 0]] = 1
+        smallest = numpy.linalg.eigvalsh(adjacency)[0]
+        alpha = min(alpha, int(n * -smallest / (d - smallest) + 1e-9))
+    return alpha
+
+
+# Reason why the connected graph needs max degree + 2 colors or None
+def type2_reason(total):
+    family = type2_family(total)
+    if family is not None:
+        return family
+
+    n, d = total.n, total.max_degree
+    alpha = independence_bound(total)
+    if (total.degree == d).all():
+        # The nodes of each color class have the parity of n
+        largest = alpha if alpha % 2 == n % 2 else alpha - 1
+        if (d + 1) * max(largest, 0) < n:
+            return "regular graph with color classes of {} nodes at most".format(max(largest, 0))
+    if (d + 1) * (alpha + (n - alpha) // 2) < n + total.m:
+        return "total independent sets of {} elements at most".format(alpha + (n - alpha) // 2)
+    return None
+
+
+# Lower bound of the total chromatic index of the graph (NetworkX graph or TotalGraph)
+# and the reason when it is max degree + 2, otherwise None
+def lower_bound(graph):
+    total = TotalGraph.of(graph)
+    if total.m == 0:
+        return (1 if total.n > 0 else 0), None
+    for component in components(total, total.max_degree):
+        reason = type2_reason(component)
+        if reason is not None:
+            return total.max_degree + 2, reason
+    return total.max_degree + 1, None
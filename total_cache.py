@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+import json
+import sqlite3
+import time
+import warnings
+import networkx
+from networkx.algorithms.isomorphism import GraphMatcher
+
+
+# Persistent cache of total colorings in SQLite database, the graphs are looked up by
+# Weisfeiler-Lehman hash and confirmed by isomorphism check, so isomorphic graphs share the entry
+class ColoringCache:
+    def __init__(self, path: str, max_size: int = 64 * 1024 * 1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(path)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS colorings (
+                               id INTEGER PRIMARY KEY,
+                               fingerprint TEXT NOT NULL,
+                               graph TEXT NOT NULL,
+                               colors INTEGER NOT NULL,
+                               coloring TEXT NOT NULL,
+                               size INTEGER NOT NULL,
+                               last_used REAL NOT NULL)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS fingerprints ON colorings (fingerprint)")
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    # Fingerprint of the graph, the same for all isomorphic graphs
+    @staticmethod
+    def fingerprint(graph) -> str:
+        # The hash may differ between networkx versions, which only causes a cache miss
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            wl_hash = networkx.weisfeiler_lehman_graph_hash(graph)
+        return "{}:{}:{}".format(len(graph.nodes), len(graph.edges), wl_hash)
+
+    # Finds the coloring of an isomorphic graph and assigns it to the graph remapped to its nodes
+    # returns the amount of colors or None when the graph isn't cached
+    def lookup(self, graph):
+        rows = self.db.execute("SELECT id, graph, colors, coloring FROM colorings WHERE fingerprint = ?",
+                               (self.fingerprint(graph),)).fetchall()
+        for row_id, stored_edges, colors, coloring in rows:
+            stored = networkx.Graph()
+            stored.add_nodes_from(range(len(graph.nodes)))
+            stored.add_edges_from(json.loads(stored_edges))
+            matcher = GraphMatcher(graph, stored)
+            if not matcher.is_isomorphic():
+                continue
+
+            node_colors, edge_colors = json.loads(coloring)
+            edge_colors = {frozenset(e): c for e, c in zip(stored.edges, edge_colors)}
+            for u in graph.nodes:
+                graph.nodes[u]["color"] = node_colors[matcher.mapping[u]]
+            for u, v in graph.edges:
+                graph.edges[u, v]["color"] = edge_colors[frozenset((matcher.mapping[u], matcher.mapping[v]))]
+
+            self.db.execute("UPDATE colorings SET last_used = ? WHERE id = ?", (time.time(), row_id))
+            self.db.commit()
+            self.hits += 1
+            return colors
+
+        self.misses += 1
+        return None
+
+    # Stores the coloring assigned to the graph, the least recently used entries are evicted
+    # when the cache grows over its maximum size
+    def store(self, graph, colors: int):
+        node_nums = {u: i for i, u in enumerate(graph.nodes)}
+        stored_edges = json.dumps([(node_nums[u], node_nums[v]) for u, v in graph.edges])
+        coloring = json.dumps([[graph.nodes[u]["color"] for u in graph.nodes],
+                               [graph.edges[e]["color"] for e in graph.edges]])
+        size = len(stored_edges) + len(coloring)
+
+        self.db.execute("INSERT INTO colorings (fingerprint, graph, colors, coloring, size, last_used) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (self.fingerprint(graph), stored_edges, colors, coloring, size, time.time()))
+
+        total_size = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM colorings").fetchone()[0]
+        if total_size > self.max_size:
+            for row_id, row_size in self.db.execute("SELECT id, size FROM colorings ORDER BY last_used").fetchall():
+                if total_size <= self.max_size:
+                    break
+                self.db.execute("DELETE FROM colorings WHERE id = ?", (row_id,))
+                total_size -= row_size
+        self.db.commit()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+import hashlib
+import mmap
+import os
+import numpy
+from pysat.formula import IDPool
+from at_most_one import at_most_one, PAIRWISE_LIMIT
+from total_graph import TotalGraph
+import color_encoding
+
+# Generation of the total coloring CNF in batches, the clauses of a batch are rows of a 2D array
+# (pairwise constraints are built by NumPy for all elements at once) or a list of clauses for
+# the at-most-one encodings with auxiliary variables. The variable of the element x with the color c
+# is x * upper_bound + c, the selectors of the optional colors follow after the last element.
+# The order and log encodings from color_encoding use fewer variables of each element, the clauses
+# are then built from the cubes of the colors instead of single variables.
+# The formula can be written to DIMACS file while it is generated and loaded back by memory mapping.
+
+
+# Size of the parts of DIMACS file which are parsed at once
+CHUNK_SIZE = 16 * 1024 * 1024
+
+# Amount of clauses converted to Python at once, the clauses of a whole batch would be kept
+# alive together and slow down the garbage collector
+ROWS_PER_CALL = 1 << 14
+
+
+# Concatenated ranges start..start + length - 1 for each pair of start and length
+def ranges(starts, lengths):
+    shift = numpy.repeat(starts - numpy.cumsum(lengths) + lengths, lengths)
+    return numpy.arange(int(lengths.sum()), dtype=numpy.int64) + shift
+
+
+# Binary clauses -first -second for each color, the literals are the element numbers
+def pair_batch(first, second, upper_bound, colors):
+    colors = numpy.asarray(colors, dtype=numpy.int64)
+    return numpy.stack((-(first[:, None] * upper_bound + colors), -(second[:, None] * upper_bound + colors)),
+                       axis=2).reshape(-1, 2)
+
+
+# Pairs of edges incident to the same node, for each of the given nodes
+def incident_pairs(total, nodes):
+    starts = total.offsets[nodes]
+    degrees = total.offsets[nodes + 1] - starts
+    positions = ranges(starts, degrees)
+    # Each position is paired with the following positions of the same node
+    later = numpy.repeat(starts + degrees, degrees) - positions - 1
+    first = numpy.repeat(positions, later)
+    second = ranges(positions + 1, later)
+    return total.incident[first], total.incident[second]
+
+
+# Clauses which are common for both modes, every element gets exactly one color,
+# the color can be used only if its selector is enabled and the endpoints of an edge
+# and the edge itself have a different color
+def common_batches(total, upper_bound, selectors, pool, amo, encoding="direct"):
+    elements = total.n + total.m
+    if encoding != "direct":
+        yield from encoded_common_batches(total, upper_bound, selectors, encoding)
+        return
+    colors = numpy.arange(1, upper_bound + 1, dtype=numpy.int64)
+    variables = numpy.arange(elements, dtype=numpy.int64)[:, None] * upper_bound + colors
+
+    # Constraint - At least 1 color for each element
+    yield variables
+
+    # Constraint - At most 1 color for each element
+    if amo == "pairwise" or upper_bound <= PAIRWISE_LIMIT:
+        i, j = numpy.triu_indices(upper_bound, 1)
+        yield numpy.stack((-variables[:, i], -variables[:, j]), axis=2).reshape(-1, 2)
+    else:
+        yield [clause for literals in variables.tolist() for clause in at_most_one(literals, pool, amo)]
+
+    # Constraint - Optional color used only when enabled
+    for c, selector in selectors.items():
+        yield numpy.stack((-variables[:, c - 1], numpy.full(elements, selector)), axis=1)
+
+    # Constraint - Different color for each (edge, v, u)
+    u, v = total.edges[:, 0], total.edges[:, 1]
+    e = numpy.arange(total.n, elements, dtype=numpy.int64)
+    for first, second in ((u, v), (u, e), (v, e)):
+        yield pair_batch(first, second, upper_bound, colors)
+
+
+# common_batches for the order and log encodings
+def encoded_common_batches(total, upper_bound, selectors, encoding):
+    elements = total.n + total.m
+    size = color_encoding.width(encoding, upper_bound)
+    base = numpy.arange(elements, dtype=numpy.int64) * size
+    yield from color_encoding.element_batches(encoding, base, upper_bound)
+
+    # Constraint - Optional color used only when enabled
+    for c, selector in selectors.items():
+        yield numpy.hstack((-color_encoding.cube(encoding, base, upper_bound, c),
+                            numpy.full((elements, 1), selector)))
+
+    # Constraint - Different color for each (edge, v, u)
+    u, v = total.edges[:, 0], total.edges[:, 1]
+    e = numpy.arange(total.n, elements, dtype=numpy.int64)
+    colors = range(1, upper_bound + 1)
+    for first, second in ((u, v), (u, e), (v, e)):
+        yield from color_encoding.difference_batches(encoding, first * size, second * size, upper_bound, colors)
+
+
+# Clauses so that the edges sharing a node have a different color, for each of the nodes and each of the colors
+def incident_batches(total, nodes, colors, upper_bound, pool, amo, encoding="direct"):
+    nodes = numpy.asarray(nodes, dtype=numpy.int64)
+    if encoding != "direct":
+        first, second = incident_pairs(total, nodes)
+        size = color_encoding.width(encoding, upper_bound)
+        yield from color_encoding.difference_batches(encoding, (first + total.n) * size, (second + total.n) * size,
+                                                     upper_bound, colors)
+        return
+    if amo != "pairwise":
+        # The encodings with auxiliary variables are used only for the nodes with many edges
+        many = total.degree[nodes] > PAIRWISE_LIMIT
+        for v in nodes[many].tolist():
+            incident = (total.incident_edges(v) + total.n) * upper_bound
+            for c in colors:
+                yield at_most_one((incident + c).tolist(), pool, amo)
+        nodes = nodes[~many]
+    first, second = incident_pairs(total, nodes)
+    yield pair_batch(first + total.n, second + total.n, upper_bound, colors)
+
+
+# Clauses breaking the symmetry of the color permutations, the vertex with maximum degree
+# and its edges form a clique so their colors can be fixed. With precedence the optional color c
+# can be used only if the color c - 1 is used as well (only in the direct encoding)
+def symmetry_batches(total, upper_bound, selectors, pool, precedence, encoding="direct"):
+    if total.n == 0:
+        return
+    v = int(total.degree.argmax())
+    size = color_encoding.width(encoding, upper_bound)
+    clique = [v] + (total.incident_edges(v) + total.n).tolist()
+    fixed = []
+    for c, x in enumerate(clique, 1):
+        fixed += [[literal] for literal in
+                  color_encoding.cube(encoding, numpy.array([x * size]), upper_bound, c)[0].tolist()]
+    yield fixed
+
+    if precedence and encoding == "direct":
+        elements = numpy.arange(total.n + total.m, dtype=numpy.int64) * upper_bound
+        used = {c: pool.id() for c in selectors}
+        for c in selectors:
+            yield numpy.stack((-(elements + c), numpy.full(len(elements), used[c])), axis=1)
+            if c - 1 in used:
+                yield [[-used[c]] + (elements + c - 1).tolist()]
+
+
+# All the clauses of the problem for the upper bound on colors
+def formula_batches(total, upper_bound, selectors, pool, amo, symmetry, precedence, encoding="direct"):
+    yield from common_batches(total, upper_bound, selectors, pool, amo, encoding)
+    if symmetry:
+        yield from symmetry_batches(total, upper_bound, selectors, pool, precedence, encoding)
+    yield from incident_batches(total, numpy.arange(total.n), range(1, upper_bound + 1), upper_bound, pool, amo,
+                                encoding)
+
+
+# Adds the batches of clauses to the solver, pysat takes only clauses of Python integers
+# so the arrays are converted by columns and zipped into the clauses
+def add_batches(g, batches):
+    for batch in batches:
+        if isinstance(batch, numpy.ndarray):
+            for i in range(0, len(batch), ROWS_PER_CALL):
+                g.append_formula(zip(*batch[i:i + ROWS_PER_CALL].T.tolist()))
+        else:
+            g.append_formula(batch)
+
+
+# Name of the DIMACS file for the graph and the encoding, the graph is identified by its edges
+# so the file is found only for the same numbering of nodes
+def dimacs_path(directory, total, upper_bound, first_optional, amo, symmetry, precedence, encoding="direct"):
+    digest = hashlib.sha1(numpy.int64(total.n).tobytes() + total.edges.tobytes()).hexdigest()
+    options = "-sym" if symmetry else ""
+    options += "-prec" if precedence else ""
+    options += "-" + encoding if encoding != "direct" else ""
+    name = "{}-k{}-o{}-{}{}.cnf".format(digest[:16], upper_bound, first_optional, amo, options)
+    return os.path.join(directory, name)
+
+
+# Writes the batches of clauses to DIMACS file while passing them on, the file is completed
+# when all the batches are consumed, variables_count is called then to get the amount of variables
+def write_dimacs(path, batches, variables_count):
+    temporary = path + ".tmp"
+    clauses = 0
+    with open(temporary, "w") as f:
+        # The header is rewritten at the end, when the counts are known
+        f.write("p cnf {:>20} {:>20}\n".format(0, 0))
+        for batch in batches:
+            if isinstance(batch, numpy.ndarray):
+                numpy.savetxt(f, numpy.column_stack((batch, numpy.zeros(len(batch), dtype=numpy.int64))), fmt="%d")
+            else:
+                f.writelines(" ".join(map(str, clause)) + " 0\n" for clause in batch)
+            clauses += len(batch)
+            yield batch
+        f.seek(0)
+        f.write("p cnf {:>20} {:>20}\n".format(variables_count(), clauses))
+    os.replace(temporary, path)
+
+
+# Loads DIMACS file by memory mapping, returns the amount of variables and the batches of clauses
+def read_dimacs(path):
+    with open(path, "rb") as f:
+        header = f.readline()
+        while header.startswith(b"c"):
+            header = f.readline()
+        variables_count = int(header.split()[2])
+        start = f.tell()
+    return variables_count, dimacs_batches(path, start)
+
+
+# Parses the clauses of DIMACS file from the position start, by parts of CHUNK_SIZE ended at a line break
+def dimacs_batches(path, start):
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        rest = numpy.empty(0, dtype=numpy.int64)
+        while start < len(data):
+            end = data.find(b"\n", min(start + CHUNK_SIZE, len(data) - 1)) + 1 or len(data)
+            literals = numpy.concatenate((rest, numpy.fromstring(data[start:end], dtype=numpy.int64, sep=" ")))
+            start = end
+
+            # The clause which continues in the next part is kept for it
+            zeros = numpy.flatnonzero(literals == 0)
+            if len(zeros) == 0:
+                rest = literals
+                continue
+            rest = literals[zeros[-1] + 1:]
+            literals = literals[:zeros[-1] + 1].tolist()
+            ends = zeros.tolist()
+            yield [literals[s + 1:e] for s, e in zip([-1] + ends[:-1], ends)]
+
+
+# Writes the formula for coloring the graph (NetworkX graph or TotalGraph) by the given amount of colors
+# to DIMACS file for external solvers, in the direct encoding the variable of the element x with the color c
+# is x * colors + c
+def export_dimacs(path, graph, colors, amo="pairwise", symmetry=False, precedence=False, encoding="direct"):
+    total = TotalGraph.of(graph)
+    pool = IDPool(start_from=(total.n + total.m) * color_encoding.width(encoding, colors) + 1)
+    batches = formula_batches(total, colors, {}, pool, amo, symmetry, precedence, encoding)
+    for _ in write_dimacs(path, batches, lambda: pool.top):
+        pass
@@ -1,171 +1,160 @@
-from constraint import *
-import random
-
-
-# Assignes the colors to graph based on the solution
-# if the value wasn't defined by the solver, random value is chosen
-def fill_colors(graph, solution, node_nums, edge_nums, defined, colors_count):
-    for u in graph.nodes():
-        if u in defined:
-            graph.nodes[u]["color"] = solution[node_nums[u]]
-        else:
-            graph.nodes[u]["color"] = random.randint(0, colors_count - 1)
-    for u, v in graph.edges():
-        num = edge_nums[u, v]
-        if num in defined:
-            graph.edges[u, v]["color"] = solution[num]
-        else:
-            graph.edges[u, v]["color"] = random.randint(0, colors_count - 1)
-
-
-# Validates the solution returned from iterative process
-def validate_solution(graph):
-    for u, v in graph.edges():
-        # Neighboring vertices with same color
-        if graph.nodes[u]["color"] == graph.nodes[v]["color"]:
-            return False
-        # Vertex and its edge have the same color
-        if graph.nodes[u]["color"] == graph.edges[u, v]["color"] or graph.nodes[v]["color"] == graph.edges[u, v]["color"]:
-            return False
-
-    for u in graph.nodes():
-        incident_colors = [graph.edges[e]["color"] for e in graph.edges(u)]
-        unique = set()
-        for col in incident_colors:
-            # Neighboring edges with the same color
-            if col in unique:
-                return False
-            unique.add(col)
-    return True
+from csp_engine import CliqueSolver
+from total_graph import TotalGraph
+import numpy
+import total_validate
+import total_search
+from total_stats import Stats
+
+
+# Splits the solution into arrays of node and edge colors
+def fill_colors(total, solution):
+    colors = numpy.array(solution, dtype=numpy.int64)
+    return colors[:total.n], colors[total.n:]
+
+
+# Creates the solver with the domains breaking the symmetry of the color permutations, the vertex
+# with maximum degree and its edges form a clique so their colors can be fixed. The colors which
+# aren't fixed are interchangeable, the solver tries only the lowest of the unused ones
+def create_solver(total, colors, symmetry):
+    elements = total.n + total.m
+    domains = [(1 << colors) - 1] * elements
+    if symmetry and total.n > 0:
+        v = int(total.degree.argmax())
+        domains[v] = 1 << 0
+        for c, e in enumerate(total.incident_edges(v).tolist(), 1):
+            domains[total.n + e] = 1 << c
+
+    interchangeable_from = total.max_degree + 1 if symmetry else 0
+    return CliqueSolver(elements, colors, domains, interchangeable_from)
+
+
+# Clique of the node and all its edges
+def star(total, v):
+    return (total.incident_edges(v) + total.n).tolist() + [v]
 
 
 # Finds total chromatic index and assigns color to each node and edge
-# in iterative manner, by providing not fully specified problem to the solver
-def total_coloring_iterative(graph):
-    # Size of the chunks in which the problem will be iteratively defined
-    chunk_size = max(1, len(graph.nodes()) // 2)
-
-    # Integers for vertices for easier manipulation and hashing
-    node_nums = {}
-    nodes = []
-
-    node_n = 0
-    max_deg = 0
-    for node in graph.nodes:
-        node_nums[node] = node_n
-        nodes.append(node)
-        max_deg = max(max_deg, graph.degree[node])
-        node_n += 1
-
-    # Integers for edges for easier manipulation and hashing
-    edge_num = len(graph.nodes())
-    edge_nums = {}
-    for e in graph.edges():
-        e0, e1 = e
-        # Edges aren't directed
-        edge_nums[e0, e1] = edge_num
-        edge_nums[e1, e0] = edge_num
-        edge_num += 1
-
-    colors = max_deg
+# in iterative manner, the solver starts without the constraints for the edges sharing a node
+# and only the constraints broken by its solution are added before solving again
+# the graph is a NetworkX graph or TotalGraph, the colors are written to the NetworkX graph with write_back,
+# the phases, the constraints and the search are measured in stats, the engine tries only the lowest unused color
+# so the colors are always used in order (the precedence of the SAT modes)
+def total_coloring_iterative(graph, symmetry=False, heuristic=False, timeout=None, write_back=True, stats=None,
+                             bounds=True):
+    stats = Stats() if stats is None else stats
+    with stats.phase("encode"):
+        total = TotalGraph.of(graph)
+    # The amount of colors is raised before each try, it starts from the lower bound
+    lower_bound, _, best, deadline = total_search.search_range(total, heuristic, timeout, stats, bounds)
+    colors = lower_bound - 1
     solution_found = False
 
+    # The nodes whose edges had the same color, they are constrained for the next amounts of colors as well
+    learned = set()
+
     # Search for solution with the given amount of colors (lower bound is max_degree + 1)
     while not solution_found:
         colors += 1
-        color_domain = [c for c in range(colors)]
-        problem = Problem()
-
-        # Set up variables for nodes and edges
-        problem.addVariables(node_nums.values(), color_domain)
-        problem.addVariables(set(edge_nums.values()), color_domain)
-
-        # Iteratively find solutions
-        starting_at = 0
-        defined = set()
-        while starting_at < len(graph.nodes):
-            # Define the problem chunk
-            for i in range(starting_at, min(starting_at + chunk_size, len(graph.nodes()))):
-                node = nodes[i]
-                defined.add(node_nums[node])
-                # Constraint for node and all its edges
-                # + Constraint for neighboring edges
-                incident = [edge_nums[e] for e in graph.edges(node)]
-                for e in incident:
-                    defined.add(e)
-                problem.addConstraint(AllDifferentConstraint(), incident + [node_nums[node]])
-
-                for u in graph[node]:
-                    # Constraint for neighboring vertices and their edge
-                    problem.addConstraint(AllDifferentConstraint(),
-                                          [node_nums[node], node_nums[u], edge_nums[(node, u)]])
-
-            # Try to get solution
-            solution = problem.getSolution()
-            solution_found = solution is not None
-            if solution_found:
-                fill_colors(graph, solution, node_nums, edge_nums, defined, colors)
-                # The solution for partially defined problem was correct
-                if validate_solution(graph):
-                    break
-
-            starting_at += chunk_size
-            
+        if best is not None and colors >= best[0]:
+            # The heuristic coloring was optimal
+            with stats.phase("decode"):
+                total.assign(best[1], best[2], "optimal", write_back)
+            return best[0]
+        stats.count("colors_tried")
+        with stats.phase("encode"):
+            solver = create_solver(total, colors, symmetry)
+
+            # Constraint for each edge and its endpoints
+            for e, (u, v) in enumerate(total.edges.tolist(), total.n):
+                solver.add_clique([u, v, e])
+            for v in learned:
+                solver.add_clique(star(total, v))
+
+        # Iteratively find solutions, only the constraints broken by the solution are added
+        while True:
+            stats.count("rounds")
+            with stats.phase("solve"):
+                solution = solver.solve(deadline)
+            stats.record_csp(solver)
+            if solution is None:
+                # Adding more constraints can't help, try more colors
+                break
+
+            with stats.phase("decode"):
+                node_colors, edge_colors = fill_colors(total, solution)
+            with stats.phase("validate"):
+                valid = total_validate.validate(node_colors, edge_colors, total.edges)
+                if not valid:
+                    conflicts = set(total_validate.edge_conflicts(edge_colors, total.edges)[:, 0].tolist())
+            if valid:
+                with stats.phase("decode"):
+                    total.assign(node_colors, edge_colors, "optimal", write_back)
+                solution_found = True
+                break
+
+            # Constraint for node and all its edges
+            with stats.phase("encode"):
+                for v in conflicts:
+                    learned.add(v)
+                    solver.add_clique(star(total, v))
+
+        if solver.timed_out:
+            # The time ran out, the heuristic coloring is used
+            with stats.phase("decode"):
+                total.assign(best[1], best[2], "feasible", write_back)
+            return best[0]
+
     return colors
 
 
 # Finds total chromatic index and assigns color to each node and edge
-def total_coloring(graph):
-    # Integers for vertices for easier manipulation and hashing
-    node_nums = {}
-    node_num = 0
-    max_deg = 0
-    for node in graph.nodes:
-        node_nums[node] = node_num
-        max_deg = max(max_deg, graph.degree[node])
-        node_num += 1
-
-    # Integers for edges for easier manipulation and hashing
-    edge_num = len(graph.nodes())
-    edge_nums = {}
-    for e in graph.edges():
-        e0, e1 = e
-        # Edges aren't directed
-        edge_nums[e0, e1] = edge_num
-        edge_nums[e1, e0] = edge_num
-        edge_num += 1
-
-    colors = max_deg
+# the graph is a NetworkX graph or TotalGraph, the colors are written to the NetworkX graph with write_back,
+# the phases, the constraints and the search are measured in stats, the engine tries only the lowest unused color
+# so the colors are always used in order (the precedence of the SAT modes)
+def total_coloring(graph, symmetry=False, heuristic=False, timeout=None, write_back=True, stats=None, bounds=True):
+    stats = Stats() if stats is None else stats
+    with stats.phase("encode"):
+        total = TotalGraph.of(graph)
+    # The amount of colors is raised before each try, it starts from the lower bound
+    lower_bound, _, best, deadline = total_search.search_range(total, heuristic, timeout, stats, bounds)
+    colors = lower_bound - 1
     solution_found = False
     solution = []
 
     # Search for solution with the given amount of colors (lower bound is max_degree + 1)
     while not solution_found:
         colors += 1
-        color_domain = [c for c in range(colors)]
-        problem = Problem()
-
-        # Set up variables for nodes and edges
-        problem.addVariables(node_nums.values(), color_domain)
-        problem.addVariables(set(edge_nums.values()), color_domain)
-
-        for node_num in node_nums:
-            # Constraint for node and all its edges
-            # + Constraint for neighboring edges
-            incident = [edge_nums[e] for e in graph.edges(node_num)]
-            problem.addConstraint(AllDifferentConstraint(), incident + [node_nums[node_num]])
+        if best is not None and colors >= best[0]:
+            # The heuristic coloring was optimal
+            with stats.phase("decode"):
+                total.assign(best[1], best[2], "optimal", write_back)
+            return best[0]
+        stats.count("colors_tried")
+        with stats.phase("encode"):
+            solver = create_solver(total, colors, symmetry)
+
+            for v in range(total.n):
+                # Constraint for node and all its edges
+                # + Constraint for neighboring edges
+                solver.add_clique(star(total, v))
 
-            for u in graph[node_num]:
-                # Constraint for neighboring vertices and their edge
-                problem.addConstraint(AllDifferentConstraint(), [node_nums[node_num], node_nums[u], edge_nums[(node_num, u)]])
+            for u, v in total.edges.tolist():
+                # Constraint for neighboring vertices
+                solver.add_clique([u, v])
 
-        solution = problem.getSolution()
+        with stats.phase("solve"):
+            solution = solver.solve(deadline)
+        stats.record_csp(solver)
         solution_found = solution is not None
 
+        if solver.timed_out:
+            # The time ran out, the heuristic coloring is used
+            with stats.phase("decode"):
+                total.assign(best[1], best[2], "feasible", write_back)
+            return best[0]
+
     # Assign values
-    for u in graph.nodes():
-        graph.nodes[u]["color"] = solution[node_nums[u]]
-    for u, v in graph.edges():
-        num = edge_nums[u, v]
-        graph.edges[u, v]["color"] = solution[num]
+    with stats.phase("decode"):
+        node_colors, edge_colors = fill_colors(total, solution)
+        total.assign(node_colors, edge_colors, "optimal", write_back)
     return colors
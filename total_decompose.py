@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import ProcessPoolExecutor
+import networkx
+import os
+import time
+import total_bounds
+import total_heuristic
+
+
+# Colors the component with the given solver and returns the colors of its nodes and edges
+# and the status of the solution, the solver gets the time left until the deadline when it starts
+# (the monotonic clock is shared by the processes)
+def solve_component(solve, component, deadline=None):
+    if deadline is None:
+        colors = solve(component)
+    else:
+        colors = solve(component, timeout=max(0.0, deadline - time.monotonic()))
+    node_colors = [component.nodes[u]["color"] for u in component.nodes]
+    edge_colors = [component.edges[e]["color"] for e in component.edges]
+    return colors, node_colors, edge_colors, component.graph.get("status", "optimal")
+
+
+# Finds total chromatic index by coloring each connected component separately,
+# the components are independent so the index of the graph is the maximum of their indices,
+# the timeout is shared by all the components, solved one after another or in the processes
+def total_coloring(graph, solve, workers=None, timeout=None):
+    deadline = None if timeout is None else time.monotonic() + timeout
+    if workers is None:
+        workers = os.cpu_count() or 1
+    components = [graph.subgraph(c).copy() for c in networkx.connected_components(graph)]
+    if not components:
+        # The empty graph has nothing to decompose, it gets the same answer as without decomposition
+        return solve(graph)
+
+    # Every component needs at least its maximum degree + 1 colors (+ 2 when certified by total_bounds),
+    # so the graph needs the maximum of them
+    lower_bound = 0
+    for component in components:
+        lower_bound = max(lower_bound, total_bounds.lower_bound(component)[0])
+
+    # The components which the heuristic colors within the lower bound don't need the solver
+    colorings = {}
+    hard = []
+    for i, component in enumerate(components):
+        heuristic = total_heuristic.dsatur(component)
+        if heuristic[0] <= lower_bound:
+            colorings[i] = heuristic + ("optimal",)
+        else:
+            hard.append(i)
+
+    if workers > 1 and len(hard) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            solved = executor.map(solve_component, [solve] * len(hard), [components[i] for i in hard],
+                                  [deadline] * len(hard))
+            colorings.update(zip(hard, solved))
+    else:
+        for i in hard:
+            colorings[i] = solve_component(solve, components[i], deadline)
+
+    # The coloring is optimal if the component which needs the most colors is solved optimally
+    colors_count = 0
+    optimal = False
+    for i, component in enumerate(components):
+        colors, node_colors, edge_colors, status = colorings[i]
+        if colors > colors_count:
+            optimal = False
+        if colors >= colors_count and status == "optimal":
+            optimal = True
+        colors_count = max(colors_count, colors)
+        for u, col in zip(component.nodes, node_colors):
+            graph.nodes[u]["color"] = col
+        for (u, v), col in zip(component.edges, edge_colors):
+            graph.edges[u, v]["color"] = col
+    graph.graph["status"] = "optimal" if optimal else "feasible"
+    return colors_count
@@ -1,167 +1,230 @@
 from total_tests import total_coloring_test
+import contextlib
+import csv
+import io
+import json
+import multiprocessing
 import networkx
-import matplotlib.pyplot as plt
-import random
+import os
+import queue as queues
+import statistics
+import time
+import total_modes
 
+# Experiments which compare the time of the modes, every (graph, mode) pair is a job run in a separate
+# process. The results are appended to JSON Lines or CSV file as soon as the job ends, so an interrupted
+# run continues with the jobs which aren't in the file yet or which crashed or were killed. The plots
+# are saved to files afterwards.
 
-# Runs experiments on randomly created graphs for various sizes
-def graph_size_experiments(modes: [], sizes: []):
-    res = {mode: [] for mode in modes}
-    density = 0.6
-    for size in sizes:
-        seed = random.randint(1, 10000)
-        graph = networkx.erdos_renyi_graph(size, density, seed)
-        for mode in modes:
-            success, elapsed = total_coloring_test("Random graph on {} vertices".format(size), mode,
-                                                   graph, None, False)
-            if not success:
-                return None
-            res[mode].append(elapsed)
-    return res
-
-
-# Runs experiments on randomly created graphs for various densities
-def graph_density_experiments(modes: [], densities: []):
-    res = {mode: [] for mode in modes}
-    graph_size = 25
-    for dens in densities:
-        seed = random.randint(1, 10000)
-        graph = networkx.erdos_renyi_graph(graph_size, dens, seed)
-        for mode in modes:
-            success, elapsed = total_coloring_test("Random graph of size {} with {} density".format(graph_size, dens), mode,
-                                                   graph, None, False)
-            if not success:
-                return None
-            res[mode].append(elapsed)
-    return res
-
-
-# Runs experiments on randomly created graphs and takes an average
-def graph_average(modes: []):
-    res = {mode: [] for mode in modes}
-    graph_size = 8
-    dens = 0.75
-
-    runs = 10
-    for _ in range(runs):
-        seed = random.randint(1, 10000)
-        graph = networkx.erdos_renyi_graph(graph_size, dens, seed)
-        for mode in modes:
-            success, elapsed = total_coloring_test("Random graph of size {} with {} density".format(graph_size, dens), mode,
-                                                   graph, None, False)
-            if not success:
-                return None
-            res[mode].append(elapsed)
-
-    for mode in modes:
-        print('Graphs size {}, density {}, mode {}: Average time {}s'.format(
-            graph_size, dens, mode, sum(res[mode]) / len(res[mode])))
-
-
-# Runs experiments on star graphs
-def star_graph_experiments(modes: [], sizes: []):
-    res = {mode: [] for mode in modes}
-    for size in sizes:
-        for mode in modes:
-            success, elapsed = total_coloring_test("Star graph on {} vertices".format(size), mode,
-                                                   networkx.star_graph(size), size + 1, False)
-            if not success:
-                return None
-            res[mode].append(elapsed)
-    return res
-
-
-# Runs experiments on complete graphs
-def complete_graph_experiments(modes: [], sizes: [], expected: []):
-    res = {mode: [] for mode in modes}
-    for i in range(len(sizes)):
-        for mode in modes:
-            success, elapsed = total_coloring_test("Complete graph on {} vertices".format(sizes[i]), mode,
-                                                   networkx.complete_graph(sizes[i]), expected[i], False)
-            if not success:
-                return None
-            res[mode].append(elapsed)
-    return res
-
-
-# Runs experiments on bipartite graphs
-def bipartite_graph_experiments(modes: [], sizes: [], expected: []):
-    res = {mode: [] for mode in modes}
-    for i in range(len(sizes)):
-        for mode in modes:
-            success, elapsed = total_coloring_test("Complete bipartite graph on {} vertices".format(sizes[i]), mode,
-                                                   networkx.complete_multipartite_graph(sizes[i], sizes[i]), expected[i], False)
-            if not success:
-                return None
-            res[mode].append(elapsed)
-    return res
-
+# Fields which identify the job in the results
+KEY_FIELDS = ["experiment", "family", "size", "density", "seed", "mode"]
+RESULT_FIELDS = KEY_FIELDS + ["expected", "success", "colors", "status", "elapsed", "error"]
 
-def handle_failure():
-    print("Experiments failed")
-    exit(1)
+# Errors of the jobs which didn't end by themselves, such jobs are run again when the experiments continue
+RETRIED_ERRORS = ("crashed", "killed after timeout")
 
+# Time after the timeout of the job for which the solver may still finish before it is killed
+GRACE_TIME = 5.0
 
-# Runs experiments which compare the time of CSP and SAT
-def run_experiments():
-    modes = ["CSP", "SAT", "CSP_iterative", "SAT_iterative"]
 
-    experiment_results = []
+# Jobs of all the experiments for the modes, the random graphs get seeds derived from the given one
+def experiment_jobs(modes, seed=0):
+    graphs = []
 
     # Specific graph structures
-    star_graph_sizes = [size for size in range(10, 100, 10)]
-    results = star_graph_experiments(modes, star_graph_sizes)
-    if results is None:
-        handle_failure()
-    experiment_results.append((star_graph_sizes, results, "star graphs"))
-
-    complete_graph_sizes = [size for size in range(1, 8, 1)]
-    total_expected = [1, 3, 3, 5, 5, 7, 7]
-    results = complete_graph_experiments(modes, complete_graph_sizes, total_expected)
-    if results is None:
-        handle_failure()
-    experiment_results.append((complete_graph_sizes, results, "complete graphs"))
-
-    complete_bipartite_graph_sizes = [size for size in range(2, 5, 1)]
-    complete_bipartite_expected = [4, 5, 6]
-    results = bipartite_graph_experiments(modes, complete_bipartite_graph_sizes, complete_bipartite_expected)
-    if results is None:
-        handle_failure()
-    experiment_results.append((complete_bipartite_graph_sizes, results, "complete bipartite graphs"))
-
-    # Randomly generated graphs, experiments based on size in nodes
-    random_graph_sizes = [size for size in range(5, 50, 5)]
-    results = graph_size_experiments(modes, random_graph_sizes)
-    if results is None:
-        handle_failure()
-    experiment_results.append((random_graph_sizes, results, "random graphs based on size"))
-
-    # Randomly generated graphs, experiments based on density
-    densities = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
-    densities_results = graph_density_experiments(modes, densities)
-    if densities_results is None:
-        handle_failure()
-
-    # Plotting
-    for experiment_res in experiment_results:
-        input_sizes, output, experiment_name = experiment_res
-        for mode in results:
-            plt.plot(input_sizes, output[mode], label='{}'.format(mode))
-
-        plt.title(
-            'Comparison of ' + ','.join(modes) + ' for {}'.format(experiment_name))
-        plt.xlabel('Size of the graph in nodes')
-        plt.ylabel('Time in seconds')
-        plt.legend()
-        plt.show()
-
-    for mode in densities_results:
-        plt.plot(densities, densities_results[mode], label='{}'.format(mode))
-    plt.title(
-        'Comparison of ' + ','.join(modes) + ' for random graphs based on density')
-    plt.xlabel('Probability of edge creation')
-    plt.ylabel('Time in seconds')
-    plt.legend()
-    plt.show()
-
-    graph_average(modes)
+    for size in range(10, 100, 10):
+        graphs.append({"experiment": "star graphs", "family": "star", "size": size, "expected": size + 1})
+    for size, expected in zip(range(1, 8), [1, 3, 3, 5, 5, 7, 7]):
+        graphs.append({"experiment": "complete graphs", "family": "complete", "size": size, "expected": expected})
+    for size, expected in zip(range(2, 5), [4, 5, 6]):
+        graphs.append({"experiment": "complete bipartite graphs", "family": "bipartite", "size": size,
+                       "expected": expected})
+
+    # Randomly generated graphs, experiments based on size in nodes and on density
+    for i, size in enumerate(range(5, 50, 5)):
+        graphs.append({"experiment": "random graphs based on size", "family": "random", "size": size,
+                       "density": 0.6, "seed": seed * 1000 + i})
+    for i, density in enumerate([0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]):
+        graphs.append({"experiment": "random graphs based on density", "family": "random", "size": 25,
+                       "density": density, "seed": seed * 1000 + 100 + i})
+    for i in range(10):
+        graphs.append({"experiment": "average of random graphs", "family": "random", "size": 8,
+                       "density": 0.75, "seed": seed * 1000 + 200 + i})
+
+    jobs = []
+    for graph in graphs:
+        for mode in modes:
+            job = {field: None for field in KEY_FIELDS + ["expected"]}
+            job.update(graph)
+            job["mode"] = mode
+            jobs.append(job)
+    return jobs
+
+
+# Identifier of the job, the same for the job and its result read from JSON Lines or CSV
+def job_key(job):
+    return tuple("" if job[field] is None else str(job[field]) for field in KEY_FIELDS)
+
+
+# Creates the graph of the job and its name used in the output
+def create_graph(job):
+    if job["family"] == "star":
+        return "Star graph on {} vertices".format(job["size"]), networkx.star_graph(job["size"])
+    if job["family"] == "complete":
+        return "Complete graph on {} vertices".format(job["size"]), networkx.complete_graph(job["size"])
+    if job["family"] == "bipartite":
+        return ("Complete bipartite graph on {} vertices".format(job["size"]),
+                networkx.complete_multipartite_graph(job["size"], job["size"]))
+    return ("Random graph of size {} with {} density".format(job["size"], job["density"]),
+            networkx.erdos_renyi_graph(job["size"], job["density"], job["seed"]))
+
+
+# Runs the job and sends its result through the queue, the output of the test is hidden
+def run_job(job, results, options):
+    name, graph = create_graph(job)
+    with contextlib.redirect_stdout(io.StringIO()):
+        success, elapsed = total_coloring_test(name, job["mode"], graph, job["expected"], False, **options)
+    colors = [graph.nodes[u].get("color", -1) for u in graph.nodes] + \
+             [graph.edges[e].get("color", -1) for e in graph.edges]
+    result = dict(job, success=success, elapsed=elapsed, status=graph.graph.get("status"), error=None,
+                  colors=max(colors) + 1 if colors else 0)
+    results.put(result)
+
+
+# Reads the results stored by the previous runs, JSON Lines or CSV by the extension of the file,
+# a job run again has only its last result
+def load_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            results = list(csv.DictReader(f))
+        else:
+            results = [json.loads(line) for line in f if line.strip()]
+    return list({job_key(result): result for result in results}.values())
+
+
+# Appends the result to the file right away, so it isn't lost when the run is interrupted
+def save_result(path, result):
+    if path.endswith(".csv"):
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+            if new:
+                writer.writeheader()
+            writer.writerow(result)
+    else:
+        with open(path, "a") as f:
+            f.write(json.dumps({field: result.get(field) for field in RESULT_FIELDS}) + "\n")
+
+
+# Runs the jobs in up to workers processes, a job running longer than its timeout and the grace time
+# is killed. Each result is saved and printed when the job ends
+def run_jobs(jobs, path, workers, timeout, options):
+    results = multiprocessing.Queue()
+    pending = list(jobs)
+    running = {}
+
+    # Starts the next pending job
+    def start_next():
+        job = pending.pop(0)
+        process = multiprocessing.Process(target=run_job, args=(job, results, options), daemon=True)
+        process.start()
+        running[job_key(job)] = (job, process, time.monotonic())
+
+    # Saves the result of the job which ended and starts the next one
+    def finish(result):
+        if job_key(result) not in running:
+            # The job was killed after sending the result
+            return
+        job, process, _ = running.pop(job_key(result))
+        process.join()
+        save_result(path, result)
+        outcome = result["status"] if result["success"] else result["error"] or "failed"
+        print("{} {} {} {}: {}".format(result["experiment"], result["size"], result["density"] or "",
+                                       result["mode"], outcome))
+        if pending:
+            start_next()
+
+    for _ in range(min(workers, len(pending))):
+        start_next()
+
+    while running:
+        try:
+            finish(results.get(timeout=0.1))
+            continue
+        except queues.Empty:
+            pass
+
+        for key, (job, process, started) in list(running.items()):
+            if timeout is not None and time.monotonic() - started > timeout + GRACE_TIME:
+                process.terminate()
+                finish(dict(job, success=False, status="unknown", error="killed after timeout"))
+            elif not process.is_alive() and process.exitcode != 0:
+                finish(dict(job, success=False, status="unknown", error="crashed"))
+
+
+# Saves the plot of the times of the modes for each experiment with a single graph per size
+def plot_results(results, modes, directory):
+    os.makedirs(directory, exist_ok=True)
+    experiments = {}
+    for result in results:
+        if result["experiment"] == "average of random graphs" or str(result["success"]) != "True":
+            continue
+        by_density = result["experiment"] == "random graphs based on density"
+        x = float(result["density"]) if by_density else int(result["size"])
+        experiments.setdefault(result["experiment"], {}).setdefault(result["mode"], []).append(
+            (x, float(result["elapsed"])))
+
+    for experiment_name, output in experiments.items():
+        figure = total_modes.load("matplotlib.figure").Figure()
+        axes = figure.subplots()
+        for mode in modes:
+            if mode in output:
+                points = sorted(output[mode])
+                axes.plot([x for x, _ in points], [y for _, y in points], label='{}'.format(mode))
+        axes.set_title('Comparison of ' + ','.join(modes) + ' for {}'.format(experiment_name))
+        if experiment_name == "random graphs based on density":
+            axes.set_xlabel('Probability of edge creation')
+        else:
+            axes.set_xlabel('Size of the graph in nodes')
+        axes.set_ylabel('Time in seconds')
+        axes.legend()
+        figure.savefig(os.path.join(directory, experiment_name.replace(" ", "_") + ".png"))
+
+
+# Prints the average time of the modes on the random graphs of the same size and density
+def print_averages(results, modes):
+    for mode in modes:
+        times = [float(result["elapsed"]) for result in results if result["mode"] == mode
+                 and result["experiment"] == "average of random graphs" and str(result["success"]) == "True"]
+        if times:
+            print('Graphs size {}, density {}, mode {}: Average time {}s'.format(8, 0.75, mode, statistics.mean(times)))
+
+
+# Runs experiments which compare the time of the modes, the jobs already stored in the results file
+# are skipped unless they crashed or were killed, the options with the timeout are passed to each test
+def run_experiments(modes=None, workers=None, results_path="results/experiments.jsonl", plots_dir="results",
+                    seed=0, **options) -> bool:
+    if modes is None:
+        modes = ["CSP", "SAT", "CSP_iterative", "SAT_iterative"]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    directory = os.path.dirname(results_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    done = {job_key(result) for result in load_results(results_path) if result["error"] not in RETRIED_ERRORS}
+    jobs = [job for job in experiment_jobs(modes, seed) if job_key(job) not in done]
+    print("Running {} jobs, {} done before".format(len(jobs), len(done)))
+    run_jobs(jobs, results_path, workers, options.get("timeout"), options)
+
+    results = load_results(results_path)
+    plot_results(results, modes, plots_dir)
+    print_averages(results, modes)
+
+    failed = [result for result in results if result["mode"] in modes and str(result["success"]) != "True"]
+    for result in failed:
+        print("Failed: {} {} {} {} {}".format(result["experiment"], result["size"], result["density"] or "",
+                                               result["mode"], result["error"] or ""))
+    return not failed
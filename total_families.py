@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+from collections import deque
+import networkx
+
+# Graph families with known total chromatic index and closed form optimal colorings
+# each coloring function returns the amount of colors and the node and edge colors as dictionaries
+
+
+# Nodes without edges need only one color, the null graph is counted with one color as well
+# (total_graph.NULL_GRAPH_COLORS)
+def edgeless_coloring(graph):
+    node_colors = {u: 0 for u in graph.nodes}
+    return 1, node_colors, {}
+
+
+# Complete graph on odd n vertices uses n colors, vertex i gets 2i mod n and edge {i, j} gets i + j mod n,
+# complete graph on even n vertices is colored as a subgraph of the complete graph on n + 1 vertices
+def complete_coloring(graph):
+    nodes = list(graph.nodes)
+    colors = len(nodes) if len(nodes) % 2 == 1 else len(nodes) + 1
+    node_nums = {u: i for i, u in enumerate(nodes)}
+    node_colors = {u: (2 * i) % colors for u, i in node_nums.items()}
+    edge_colors = {(u, v): (node_nums[u] + node_nums[v]) % colors for u, v in graph.edges}
+    return colors, node_colors, edge_colors
+
+
+# Forests with maximum degree d >= 2 need d + 1 colors, the trees are colored from their roots,
+# the edges to the children avoid the color of the node and of its parent edge,
+# the children avoid the color of the node and of the edge leading to them
+def forest_coloring(graph):
+    max_deg = max(graph.degree[u] for u in graph.nodes)
+    colors = max_deg + 1 if max_deg >= 2 else 3
+    node_colors = {}
+    edge_colors = {}
+
+    for root in graph.nodes:
+        if root in node_colors:
+            continue
+        node_colors[root] = 0
+        queue = deque([(root, None, None)])
+        while queue:
+            v, parent, parent_edge = queue.popleft()
+            free = (c for c in range(colors) if c != node_colors[v] and c != parent_edge)
+            for w in graph[v]:
+                if w == parent:
+                    continue
+                edge_col = next(free)
+                edge_colors[v, w] = edge_col
+                node_colors[w] = next(c for c in range(colors) if c != node_colors[v] and c != edge_col)
+                queue.append((w, v, edge_col))
+    return colors, node_colors, edge_colors
+
+
+# Cycle is colored along the sequence v0, e0, v1, e1, ... where any three consecutive elements must differ,
+# length divisible by 3 is colored by 0, 1, 2 repeating, otherwise one or two blocks of 0, 1, 2, 3 are used
+def cycle_coloring(graph):
+    start = next(iter(graph.nodes))
+    order = [start]
+    previous = None
+    while True:
+        v = order[-1]
+        w = next(u for u in graph[v] if u != previous and u != v)
+        if w == start:
+            break
+        order.append(w)
+        previous = v
+
+    length = 2 * len(order)
+    if length % 3 == 0:
+        colors = 3
+        pattern = [i % 3 for i in range(length)]
+    else:
+        colors = 4
+        long_blocks = 1 if length % 3 == 1 else 2
+        pattern = [0, 1, 2, 3] * long_blocks + [0, 1, 2] * ((length - 4 * long_blocks) // 3)
+
+    node_colors = {}
+    edge_colors = {}
+    for i, v in enumerate(order):
+        node_colors[v] = pattern[2 * i]
+        edge_colors[v, order[(i + 1) % len(order)]] = pattern[2 * i + 1]
+    return colors, node_colors, edge_colors
+
+
+# Complete bipartite graph with sides of size m <= n, the edge (a_i, b_j) gets i + j mod n, the side of size m
+# gets color n, if m < n the vertex b_j gets the color m + j mod n missing among its edges, otherwise color n + 1
+def complete_bipartite_coloring(graph, side_a, side_b):
+    if len(side_a) > len(side_b):
+        side_a, side_b = side_b, side_a
+    m, n = len(side_a), len(side_b)
+    a_nums = {u: i for i, u in enumerate(side_a)}
+    b_nums = {u: j for j, u in enumerate(side_b)}
+
+    node_colors = {u: n for u in side_a}
+    for u, j in b_nums.items():
+        node_colors[u] = (m + j) % n if m < n else n + 1
+    edge_colors = {}
+    for u, v in graph.edges:
+        a, b = (u, v) if u in a_nums else (v, u)
+        edge_colors[u, v] = (a_nums[a] + b_nums[b]) % n
+    return (n + 1 if m < n else n + 2), node_colors, edge_colors
+
+
+# Recognizes the family of the graph, returns the name of the family and its coloring function or None
+def recognize(graph):
+    n = len(graph.nodes)
+    m = len(graph.edges)
+    if networkx.number_of_selfloops(graph) > 0:
+        return None
+    if m == 0:
+        return "edgeless", edgeless_coloring
+    if m == n * (n - 1) // 2:
+        return "complete", complete_coloring
+    if networkx.is_forest(graph):
+        max_deg = max(graph.degree[u] for u in graph.nodes)
+        if max_deg == n - 1:
+            return "star", forest_coloring
+        if max_deg <= 2 and networkx.is_connected(graph):
+            return "path", forest_coloring
+        return "forest", forest_coloring
+    if not networkx.is_connected(graph):
+        return None
+    if all(graph.degree[u] == 2 for u in graph.nodes):
+        return "cycle", cycle_coloring
+    if networkx.is_bipartite(graph):
+        side_a, side_b = networkx.bipartite.sets(graph)
+        if m == len(side_a) * len(side_b):
+            return "complete bipartite", lambda g: complete_bipartite_coloring(g, side_a, side_b)
+    return None
+
+
+# Colors the graph by the closed form of its family, returns the name of the family
+# and the amount of colors or (None, None) when the family isn't known
+def total_coloring(graph):
+    family = recognize(graph)
+    if family is None:
+        return None, None
+
+    name, coloring = family
+    colors, node_colors, edge_colors = coloring(graph)
+    for u in graph.nodes:
+        graph.nodes[u]["color"] = node_colors[u]
+    for (u, v), col in edge_colors.items():
+        graph.edges[u, v]["color"] = col
+    graph.graph["status"] = "optimal"
+    return name, colors
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import numpy
+import total_validate
+
+# Amount of colors of the null graph (without nodes), counted as the max degree + 1 lower bound like
+# for any other graph, every mode and option returns it
+NULL_GRAPH_COLORS = 1
+
+
+# Compact graph used by the solvers, the nodes are numbered 0..n-1 and the edges 0..m-1 (in the order
+# of graph.nodes and graph.edges for a NetworkX graph), in the total graph the edge e is the element n + e.
+# The edges incident to the node u are incident[offsets[u]:offsets[u + 1]] and adjacent holds
+# the other endpoints of these edges at the same positions
+class TotalGraph:
+    def __init__(self, n: int, edges, source=None):
+        self.n = n
+        self.edges = numpy.asarray(edges, dtype=numpy.int64).reshape(-1, 2)
+        self.m = len(self.edges)
+        # NetworkX graph the coloring is written back to
+        self.source = source
+
+        ends = self.edges.ravel()
+        self.degree = numpy.bincount(ends, minlength=n).astype(numpy.int64)
+        self.max_degree = int(self.degree.max()) if n > 0 else 0
+        self.offsets = numpy.concatenate(([0], numpy.cumsum(self.degree))).astype(numpy.int64)
+        order = numpy.argsort(ends, kind="stable")
+        self.incident = order // 2
+        self.adjacent = ends[order ^ 1]
+
+        self.node_colors = None
+        self.edge_colors = None
+        self.status = None
+
+    @classmethod
+    def from_networkx(cls, graph):
+        node_nums = {u: i for i, u in enumerate(graph.nodes)}
+        edges = numpy.fromiter((node_nums[w] for e in graph.edges for w in e), dtype=numpy.int64,
+                               count=2 * graph.number_of_edges())
+        return cls(len(node_nums), edges, graph)
+
+    # Graph from the (u, v) pairs of node numbers, the nodes are 0..n-1
+    @classmethod
+    def from_edges(cls, edges, n: int = None):
+        edges = numpy.asarray(edges, dtype=numpy.int64).reshape(-1, 2)
+        if n is None:
+            n = int(edges.max()) + 1 if len(edges) else 0
+        return cls(n, edges)
+
+    # The graph itself or the compact graph built from the NetworkX graph
+    @classmethod
+    def of(cls, graph):
+        return graph if isinstance(graph, cls) else cls.from_networkx(graph)
+
+    # Numbers of the edges incident to the node
+    def incident_edges(self, u):
+        return self.incident[self.offsets[u]:self.offsets[u + 1]]
+
+    # Numbers of the nodes adjacent to the node
+    def neighbors(self, u):
+        return self.adjacent[self.offsets[u]:self.offsets[u + 1]]
+
+    # Stores the coloring found by the solver and its status, with write_back it is also assigned
+    # to the NetworkX graph the compact graph was built from
+    def assign(self, node_colors, edge_colors, status, write_back=True):
+        self.node_colors = numpy.asarray(node_colors, dtype=numpy.int64)
+        self.edge_colors = numpy.asarray(edge_colors, dtype=numpy.int64)
+        self.status = status
+        if write_back and self.source is not None:
+            total_validate.assign_colors(self.source, self.node_colors, self.edge_colors)
+            self.source.graph["status"] = status
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+import heapq
+from total_graph import TotalGraph, NULL_GRAPH_COLORS
+
+
+# DSATUR on the total graph, the nodes are elements 0..n-1 and edges follow them
+# the graph is a NetworkX graph or TotalGraph,
+# returns the amount of colors used and the colors of nodes and edges
+def dsatur(graph):
+    total = TotalGraph.of(graph)
+    n = total.n
+    ends = total.edges.tolist()
+    offsets = total.offsets.tolist()
+    incident = (total.incident + n).tolist()
+    adjacent = total.adjacent.tolist()
+
+    # Neighbors of the element in the total graph
+    def neighbors(x):
+        if x < n:
+            return adjacent[offsets[x]:offsets[x + 1]] + incident[offsets[x]:offsets[x + 1]]
+        u, v = ends[x - n]
+        return [u, v] + [e for e in incident[offsets[u]:offsets[u + 1]] if e != x] + \
+            [e for e in incident[offsets[v]:offsets[v + 1]] if e != x]
+
+    def degree(x):
+        if x < n:
+            return 2 * (offsets[x + 1] - offsets[x])
+        u, v = ends[x - n]
+        return offsets[u + 1] - offsets[u] + offsets[v + 1] - offsets[v]
+
+    elements = n + len(ends)
+    colors = [-1] * elements
+    saturation = [set() for _ in range(elements)]
+    heap = [(0, -degree(x), x) for x in range(elements)]
+    heapq.heapify(heap)
+
+    while heap:
+        sat, deg, x = heapq.heappop(heap)
+        # Outdated entry, the element has been colored or its saturation has grown
+        if colors[x] != -1 or -sat != len(saturation[x]):
+            continue
+
+        c = 0
+        while c in saturation[x]:
+            c += 1
+        colors[x] = c
+
+        for y in neighbors(x):
+            if colors[y] == -1 and c not in saturation[y]:
+                saturation[y].add(c)
+                heapq.heappush(heap, (-len(saturation[y]), -degree(y), y))
+
+    colors_count = max(colors) + 1 if colors else 0
+    return colors_count, colors[:n], colors[n:]
+
+
+# Colors the graph with DSATUR heuristic, the amount of colors is an upper bound of the total chromatic index
+def total_coloring(graph, write_back=True):
+    total = TotalGraph.of(graph)
+    colors_count, node_colors, edge_colors = dsatur(total)
+    total.assign(node_colors, edge_colors, "feasible", write_back)
+    return max(colors_count, NULL_GRAPH_COLORS)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+import random
+import time
+import numpy
+from total_graph import TotalGraph, NULL_GRAPH_COLORS
+import total_bounds
+import total_heuristic
+import total_validate
+from total_stats import Stats
+
+# Local search for total coloring, tabu search (TabuCol) over the colors of nodes and edges with a fixed
+# amount of colors. The conflicts of each element with each color are counted in a matrix which is updated
+# only at the neighbors of the recolored element, so a move costs O(deg) besides choosing it.
+
+
+# Neighbors of each element of the total graph, the nodes are elements 0..n-1 and edges follow them
+def total_neighbors(total):
+    n = total.n
+    neighbors = []
+    for u in range(n):
+        adjacent = total.neighbors(u)
+        neighbors.append(numpy.concatenate((adjacent[adjacent != u], total.incident_edges(u) + n)))
+    for e, (u, v) in enumerate(total.edges.tolist()):
+        ends = [u] if u == v else [u, v]
+        incident = numpy.concatenate([total.incident_edges(w) for w in ends])
+        neighbors.append(numpy.concatenate((ends, incident[incident != e] + n)))
+    return [numpy.unique(x).astype(numpy.int64) for x in neighbors]
+
+
+# Tabu search for coloring by colors_count colors starting from the given colors, the elements with
+# higher colors get a random one. Returns the colors without conflicts or None when the iterations
+# or the time ran out
+def tabu_search(neighbors, initial, colors_count, iterations, deadline=None, rng=None):
+    rng = random.Random() if rng is None else rng
+    elements = len(initial)
+    colors = numpy.array([c if c < colors_count else rng.randrange(colors_count) for c in initial],
+                         dtype=numpy.int64)
+
+    # conflicts[x, c] is the amount of neighbors of x which have the color c
+    conflicts = numpy.zeros((elements, colors_count), dtype=numpy.int64)
+    for x in range(elements):
+        conflicts[x] = numpy.bincount(colors[neighbors[x]], minlength=colors_count)
+    own = conflicts[numpy.arange(elements), colors]
+    conflicted = set(numpy.flatnonzero(own).tolist())
+    total = int(own.sum()) // 2
+    best_total = total
+
+    # The move back to the color is forbidden until the iteration stored here
+    tabu = numpy.zeros((elements, colors_count), dtype=numpy.int64)
+    forbidden = numpy.iinfo(numpy.int64).max
+
+    for it in range(iterations):
+        if not conflicted:
+            return colors
+        if deadline is not None and it % 256 == 0 and time.monotonic() >= deadline:
+            return None
+
+        candidates = numpy.fromiter(conflicted, dtype=numpy.int64, count=len(conflicted))
+        rows = numpy.arange(len(candidates))
+        current = colors[candidates]
+        delta = conflicts[candidates] - conflicts[candidates, current][:, None]
+        # Tabu moves are allowed when they lead to the fewest conflicts seen so far (aspiration)
+        allowed = (tabu[candidates] <= it) | (total + delta < best_total)
+        allowed[rows, current] = False
+        delta = numpy.where(allowed, delta, forbidden)
+
+        best = delta.min()
+        if best == forbidden:
+            # All the moves are tabu, a random one is made
+            i, c = rng.randrange(len(candidates)), rng.randrange(colors_count)
+            if c == current[i]:
+                continue
+            best = conflicts[candidates[i], c] - conflicts[candidates[i], current[i]]
+        else:
+            ties = numpy.flatnonzero(delta == best)
+            i, c = divmod(int(ties[rng.randrange(len(ties))]), colors_count)
+
+        x = int(candidates[i])
+        old = int(colors[x])
+        adjacent = neighbors[x]
+        conflicts[adjacent, old] -= 1
+        conflicts[adjacent, c] += 1
+        colors[x] = c
+        total += int(best)
+        best_total = min(best_total, total)
+        tabu[x, old] = it + int(0.6 * len(conflicted)) + rng.randrange(10) + 1
+
+        changed = numpy.append(adjacent, x)
+        for y, count in zip(changed.tolist(), conflicts[changed, colors[changed]].tolist()):
+            if count > 0:
+                conflicted.add(y)
+            else:
+                conflicted.discard(y)
+
+    return colors if not conflicted else None
+
+
+# Colors the graph by tabu search, the DSATUR coloring is improved to max_degree + 1 colors
+# or at least to max_degree + 2 colors, only the coloring with max_degree + 1 colors is known to be optimal
+# unless total_bounds certifies that the graph needs max_degree + 2 colors
+# the graph is a NetworkX graph or TotalGraph, the colors are written to the NetworkX graph with write_back,
+# the times of the phases are measured in stats
+def total_coloring(graph, iterations=None, timeout=None, seed=None, write_back=True, stats=None, bounds=True):
+    deadline = None if timeout is None else time.monotonic() + timeout
+    stats = Stats() if stats is None else stats
+    rng = random.Random(seed)
+    with stats.phase("encode"):
+        total = TotalGraph.of(graph)
+    n = total.n
+    # The graphs certified by total_bounds need max degree + 2 colors, the coloring with them is optimal
+    lower_bound = total.max_degree + 1
+    if bounds:
+        with stats.phase("bounds"):
+            lower_bound = max(lower_bound, total_bounds.lower_bound(total)[0])
+
+    with stats.phase("heuristic"):
+        best = total_heuristic.dsatur(total)
+    if best[0] > lower_bound:
+        with stats.phase("encode"):
+            neighbors = total_neighbors(total)
+        if iterations is None:
+            iterations = 10000 + 10 * len(neighbors)
+
+        for colors_count in (lower_bound, lower_bound + 1):
+            if colors_count >= best[0]:
+                break
+            stats.count("colors_tried")
+            with stats.phase("solve"):
+                colors = tabu_search(neighbors, best[1] + best[2], colors_count, iterations, deadline, rng)
+            # The coloring is checked by the validator before it is trusted
+            with stats.phase("validate"):
+                if colors is not None and total_validate.validate(colors[:n], colors[n:], total.edges):
+                    best = (colors_count, colors[:n], colors[n:])
+                    break
+
+    with stats.phase("decode"):
+        total.assign(best[1], best[2], "optimal" if best[0] <= lower_bound else "feasible", write_back)
+    return max(best[0], NULL_GRAPH_COLORS)
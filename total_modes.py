@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import importlib
+import sys
+import time
+from functools import partial
+
+# Registry of the coloring modes, each mode is a function of a module which is imported on the first use
+# of the mode, so a run loads only the solvers (pysat, the CSP engine, ...) of the modes it runs. Other
+# lazily needed modules (the plotting stack) are imported by load() as well and the time of every such import
+# is kept for the report. A new engine is added by register() without changing the dispatch of main.py,
+# total_tests.py or total_batch.py.
+
+# Registered modes by their names
+MODES = {}
+# Seconds spent by the imports of load() for each module, including the modules imported by it
+IMPORT_TIMES = {}
+
+
+# Imports the module on the first call and measures the time of the import
+def load(name: str):
+    if name not in sys.modules:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        IMPORT_TIMES[name] = time.perf_counter() - start
+    return sys.modules[name]
+
+
+# Coloring mode, the function of the module colors a graph and takes the listed options, the other options
+# are ignored, the parallel modes start their own processes
+class Mode:
+    def __init__(self, name: str, module: str, function: str, options=(), parallel: bool = False):
+        self.name = name
+        self.module = module
+        self.function = function
+        self.options = set(options)
+        self.parallel = parallel
+
+    # Function coloring the graph with the options of the mode
+    def solver(self, **options):
+        function = getattr(load(self.module), self.function)
+        return partial(function, **{name: value for name, value in options.items() if name in self.options})
+
+
+# Registers the mode, a mode with the same name is replaced
+def register(name: str, module: str, function: str = "total_coloring", options=(), parallel: bool = False):
+    MODES[name] = Mode(name, module, function, options, parallel)
+    return MODES[name]
+
+
+# Function coloring the graph by the mode with the given options or None for unknown mode
+def solver_for(mode: str, **options):
+    if mode not in MODES:
+        return None
+    return MODES[mode].solver(**options)
+
+
+# Report of the startup time and the lazy imports done so far, the slowest first
+def import_report(startup: float) -> str:
+    lines = ["startup: {:.3f}s".format(startup)]
+    for name, seconds in sorted(IMPORT_TIMES.items(), key=lambda item: -item[1]):
+        lines.append("{}: {:.3f}s".format(name, seconds))
+    return "\n".join(lines)
+
+
+SAT_OPTIONS = ("amo", "symmetry", "precedence", "heuristic", "timeout", "stats", "encoding")
+CSP_OPTIONS = ("symmetry", "heuristic", "timeout", "stats")
+
+register("SAT", "total_sat", options=SAT_OPTIONS + ("cnf_dir",))
+register("SAT_iterative", "total_sat", "total_coloring_iterative", SAT_OPTIONS)
+register("CSP", "total_csp", options=CSP_OPTIONS)
+register("CSP_iterative", "total_csp", "total_coloring_iterative", CSP_OPTIONS)
+register("portfolio", "total_portfolio", options=SAT_OPTIONS + ("workers",), parallel=True)
+register("LS", "total_local", options=("timeout", "stats"))
+register("vizing", "total_vizing", options=("timeout", "stats"))
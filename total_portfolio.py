@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import multiprocessing
+import queue as queues
+import os
+import time
+import total_sat as sat_solver
+import total_csp as csp_solver
+import total_validate
+import total_search
+from total_stats import Stats
+
+# Engines raced by the portfolio, the mode and the SAT solver used by the mode
+ENGINES = [("SAT", "glucose3"), ("CSP", None), ("SAT", "cadical153"), ("SAT", "glucose4"),
+           ("SAT", "maplechrono"), ("SAT", "lingeling")]
+
+
+# Colors the graph with one engine and sends the colors and the status back through the queue
+# if the engine fails, the colors count sent is None
+def run_engine(engine, graph, results, amo, symmetry, precedence, heuristic, timeout=None, encoding="direct"):
+    mode, solver = engine
+    try:
+        if mode == "SAT":
+            colors = sat_solver.total_coloring(graph, amo, symmetry, precedence, heuristic, solver, timeout,
+                                               encoding=encoding)
+        else:
+            colors = csp_solver.total_coloring(graph, symmetry, heuristic, timeout)
+    except Exception:
+        results.put((engine, None, None, None, None))
+        return
+    node_colors = [graph.nodes[u]["color"] for u in graph.nodes]
+    edge_colors = [graph.edges[e]["color"] for e in graph.edges]
+    results.put((engine, colors, node_colors, edge_colors, graph.graph.get("status", "optimal")))
+
+
+# Name of the engine used in the output
+def engine_name(engine):
+    mode, solver = engine
+    return mode if solver is None else "{}/{}".format(mode, solver)
+
+
+# Finds total chromatic index by racing the engines in separate processes,
+# the first optimal result is used and the other engines are terminated,
+# when the time runs out the best coloring found so far is used, the race is measured as the solve phase in stats
+def total_coloring(graph, amo="pairwise", symmetry=False, precedence=False, heuristic=False,
+                   engines=None, workers=None, timeout=None, stats=None, encoding="direct"):
+    stats = Stats() if stats is None else stats
+    with stats.phase("solve"):
+        return race(graph, amo, symmetry, precedence, heuristic, engines, workers, timeout, encoding)
+
+
+# Races the engines and assigns the best coloring to the graph
+def race(graph, amo, symmetry, precedence, heuristic, engines, workers, timeout, encoding="direct"):
+    if engines is None:
+        engines = ENGINES
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(engines)))
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    results = multiprocessing.Queue()
+    pending = list(engines)
+    running = {}
+
+    # Time left for the engine started now
+    def remaining():
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    # Starts the next pending engine
+    def start_next():
+        engine = pending.pop(0)
+        process = multiprocessing.Process(target=run_engine, daemon=True,
+                                          args=(engine, graph, results, amo, symmetry, precedence, heuristic,
+                                                remaining(), encoding))
+        process.start()
+        running[engine] = process
+
+    for _ in range(workers):
+        start_next()
+
+    winner = None
+    best = None
+    while winner is None:
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        try:
+            engine, colors, node_colors, edge_colors, status = results.get(timeout=0.1)
+        except queues.Empty:
+            # Engines which died without sending the result are replaced as well
+            for engine, process in list(running.items()):
+                if not process.is_alive() and process.exitcode != 0:
+                    del running[engine]
+                    if pending:
+                        start_next()
+            if not running:
+                break
+            continue
+
+        running.pop(engine).join()
+        if colors is not None and (best is None or colors < best[1]):
+            best = (engine, colors, node_colors, edge_colors, status)
+        if colors is not None and status == "optimal":
+            winner = engine
+        elif pending:
+            start_next()
+        elif not running:
+            break
+
+    for process in running.values():
+        process.terminate()
+    for process in running.values():
+        process.join()
+
+    if best is None:
+        if deadline is None:
+            raise RuntimeError("All engines of the portfolio failed")
+        # No engine finished in time, the heuristic or constructive coloring is used
+        colors, node_colors, edge_colors = total_search.warm_start(graph)
+        best = (None, colors, node_colors, edge_colors, "feasible")
+
+    engine, colors, node_colors, edge_colors, status = best
+    total_validate.assign_colors(graph, node_colors, edge_colors)
+    if engine is not None:
+        graph.graph["engine"] = engine_name(engine)
+    graph.graph["status"] = status
+    return colors
@@ -1,261 +1,238 @@
 #!/usr/bin/env python3
 
-from pysat.solvers import Glucose3
-import networkx
-from bisect import bisect_left
-
-
-# Assignes the colors to graph based on the solution
-# if the value wasn't defined by the solver, random value is chosen
-def fill_colors(graph, solution, color_values, variables, edge_nums):
-    solution = [x for x in solution if x > 0]
-    for u in graph.nodes():
-        node_col = -1
-        for c in color_values:
-            var_num = variables[u, c]
-            if binary_search(solution, var_num) is not None:
-                node_col = c
-                break
-        graph.nodes[u]["color"] = node_col - 1
-    for u, v in graph.edges():
-        edge_col = -1
-        for c in color_values:
-            var_num = variables[edge_nums[u, v], c]
-            if binary_search(solution, var_num) is not None:
-                edge_col = c
-                break
-        graph.edges[u, v]["color"] = edge_col - 1
-
-
-# Validates the solution returned from iterative process
-def validate_solution(graph):
-    for u, v in graph.edges():
-        # Neighboring vertices with same color
-        if graph.nodes[u]["color"] == graph.nodes[v]["color"]:
-            return False
-        # Vertex and its edge have the same color
-        if graph.nodes[u]["color"] == graph.edges[u, v]["color"] or graph.nodes[v]["color"] == graph.edges[u, v]["color"]:
-            return False
-
-    for u in graph.nodes():
-        incident_colors = [graph.edges[e]["color"] for e in graph.edges(u)]
-        unique = set()
-        for col in incident_colors:
-            # Neighboring edges with the same color
-            if col in unique:
-                return False
-            unique.add(col)
-    return True
-
-
-def binary_search(a, x):
-    i = bisect_left(a, x)
-    if i != len(a) and a[i] == x:
-        return i
-    else:
+from pysat.solvers import Solver
+from pysat.formula import IDPool
+from total_graph import TotalGraph
+import numpy
+import os
+import threading
+import time
+import color_encoding
+import total_cnf
+import total_validate
+import total_search
+from total_stats import Stats
+
+
+# Decodes the colors of nodes and edges from the solution into arrays, the variables of the element
+# with number x are x * width + 1, ..., (x + 1) * width and the model lists the variables
+# in order, so the colors are read from the model directly
+# if the value wasn't defined by the solver, -2 is used
+def fill_colors(total, solution, upper_bound, encoding="direct"):
+    elements = total.n + total.m
+    size = color_encoding.width(encoding, upper_bound)
+    values = numpy.asarray(solution[:elements * size], dtype=numpy.int64).reshape(elements, size) > 0
+    colors = color_encoding.decode(encoding, values, upper_bound)
+    return colors[:total.n], colors[total.n:]
+
+
+# Encoding of the colors for the graph, auto chooses it by the max degree and the density
+def resolve_encoding(total, encoding):
+    if encoding != "auto":
+        return encoding
+    pairs = total.n * (total.n - 1) // 2
+    return color_encoding.choose(total.max_degree, total.m / pairs if pairs else 0.0)
+
+
+# Defines the selector variables for the optional colors, the variables of the element x
+# are x * width + 1, ..., (x + 1) * width, the colors from first_optional to upper_bound can be disabled
+# by assuming the negation of their selector
+def define_variables(total, upper_bound, first_optional, encoding="direct"):
+    top = (total.n + total.m) * color_encoding.width(encoding, upper_bound)
+    selectors = {c: top + c for c in range(first_optional, upper_bound + 1)}
+
+    # Pool for the auxiliary variables of the at-most-one encodings
+    pool = IDPool(start_from=top + upper_bound + 1)
+    return selectors, pool
+
+
+# Adds the clauses so that the edges sharing the node have a different color, for the (node, color) pairs
+def add_learned_clauses(g, total, pairs, upper_bound, pool, amo, encoding="direct"):
+    by_color = {}
+    for v, c in pairs:
+        by_color.setdefault(c, []).append(v)
+    for c, nodes in by_color.items():
+        total_cnf.add_batches(g, total_cnf.incident_batches(total, nodes, [c + 1], upper_bound, pool, amo,
+                                                            encoding))
+
+
+# Solvers which can't be interrupted, with a deadline they are only stopped between the calls
+UNINTERRUPTIBLE = {"cadical103", "cadical153", "cadical195", "lingeling"}
+
+
+# Solves the problem under the assumptions, the solver is interrupted at the deadline
+# returns None when the time ran out
+def solve_until(g, assumptions, solver, deadline):
+    if deadline is None:
+        return g.solve(assumptions=assumptions)
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
         return None
+    if solver in UNINTERRUPTIBLE:
+        return g.solve(assumptions=assumptions)
 
+    timer = threading.Timer(remaining, g.interrupt)
+    timer.start()
+    try:
+        return g.solve_limited(assumptions=assumptions, expect_interrupt=True)
+    finally:
+        # An armed timer would interrupt the next call of the reused solver
+        timer.cancel()
+        g.clear_interrupt()
 
-# Finds total chromatic index and assigns color to each node and edge
-# in iterative manner, by providing not fully specified problem to the solver
-def total_coloring_iterative(graph):
-    # Size of the chunks in which the problem will be iteratively defined
-    chunk_size = max(1, len(graph.nodes()) // 3)
-
-    nodes = []
 
-    # Initiate
-    max_deg = 0
-    for node in graph.nodes:
-        max_deg = max(max_deg, graph.degree[node])
-        nodes.append(node)
-    colors_count = max_deg
-
-    edge_nums = {}
-    edge_num = len(graph.nodes)
-    edge_nums_values = []
-    for e in graph.edges:
-        edge_nums[e[0], e[1]] = edge_num
-        edge_nums[e[1], e[0]] = edge_num
-        edge_nums_values.append(edge_num)
-        edge_num += 1
-
-    solution_found = False
-    solution = []
-
-    color_values = []
-    variables = {}
+# Assumptions which disable all the optional colors above colors_count
+def color_assumptions(selectors, colors_count):
+    return [-selector for c, selector in selectors.items() if c > colors_count]
 
-    # Search for solution with the given amount of colors (lower bound is max_degree + 1)
-    while not solution_found:
-        colors_count += 1
-        color_values = [c + 1 for c in range(colors_count)]
 
+# Finds total chromatic index and assigns color to each node and edge
+# in iterative manner, the solver starts without the constraints for the edges sharing a node
+# and only the constraints broken by its solution are added before solving again
+# the graph is a NetworkX graph or TotalGraph, the colors are written to the NetworkX graph with write_back,
+# the phases, the formula and the search are measured in stats, the colors are encoded by the encoding
+# from color_encoding (direct, order, log or auto), the solvers in UNINTERRUPTIBLE ignore the timeout
+# during a call and are only stopped between the calls
+def total_coloring_iterative(graph, amo="pairwise", symmetry=False, precedence=False, heuristic=False,
+                             solver="glucose3", timeout=None, write_back=True, stats=None, encoding="direct",
+                             bounds=True):
+    # Initiate
+    stats = Stats() if stats is None else stats
+    with stats.phase("encode"):
+        total = TotalGraph.of(graph)
+        encoding = resolve_encoding(total, encoding)
+    max_deg = total.max_degree
+
+    # The problem is encoded once for the upper bound and the colors above the currently
+    # tried amount are disabled by assumptions, so the learned clauses are kept between the rounds
+    colors_count, upper_bound, best, deadline = total_search.search_range(total, heuristic, timeout, stats, bounds)
+    timed_out = False
+    # The (node, color) pairs whose constraints were added, they are kept when the problem is encoded again
+    learned = set()
+    # The last amount of colors tried, counted once for all its rounds
+    tried = None
+
+    while not timed_out and (best is None or colors_count < best[0]):
         # Define problem
-        g = Glucose3()
-
-        # Define variables
-        cnt = 0
-        variables = {}
-        for v in graph.nodes:
-            for c in color_values:
-                variables[(v, c)] = cnt * colors_count + c
-            cnt += 1
-        for e in edge_nums_values:
-            for c in color_values:
-                variables[(e, c)] = cnt * colors_count + c
-            cnt += 1
-
-        # Common clauses so that we get at least some colors assigned
-        for v in graph.nodes:
-            # Constraint - At least 1 color for each node
-            g.add_clause([variables[v, c] for c in color_values])
-
-            # Constraint - At most 1 color for each node
-            for i in range(len(color_values) - 1):
-                for j in range(i + 1, len(color_values)):
-                    g.add_clause([-variables[v, color_values[i]], -variables[v, color_values[j]]])
-
-        for e0, e1 in graph.edges:
-            e = edge_nums[e0, e1]
-            # Constraint - At least 1 color for each edge
-            g.add_clause([variables[e, c] for c in color_values])
-
-            # Constraint - At least 1 color for each edge
-            for i in range(len(color_values) - 1):
-                for j in range(i + 1, len(color_values)):
-                    g.add_clause([-variables[e, color_values[i]], -variables[e, color_values[j]]])
-
-            # Constraint - Different color for each (edge, v, u)
-            for c in color_values:
-                g.add_clause([-variables[e0, c], -variables[e1, c]])
-                g.add_clause([-variables[e0, c], -variables[e, c]])
-                g.add_clause([-variables[e1, c], -variables[e, c]])
+        with stats.phase("encode"):
+            selectors, pool = define_variables(total, upper_bound, max_deg + 2, encoding)
+            g = Solver(name=solver)
+            total_cnf.add_batches(g, total_cnf.common_batches(total, upper_bound, selectors, pool, amo, encoding))
+            if symmetry:
+                total_cnf.add_batches(g, total_cnf.symmetry_batches(total, upper_bound, selectors, pool, precedence,
+                                                                    encoding))
+            add_learned_clauses(g, total, learned, upper_bound, pool, amo, encoding)
 
         # Iteratively find solutions
-        starting_at = 0
-        while starting_at < len(graph.nodes):
-            # Define the problem chunk
-            for node_i in range(starting_at, min(starting_at + chunk_size, len(graph.nodes()))):
-                v = nodes[node_i]
-                # Constraint - Different color for each pair of edges sharing a node
-                incident = [e for e in graph.edges(v)]
-                for c in color_values:
-                    if len(incident) > 1:
-                        for i in range(len(incident) - 1):
-                            for j in range(i + 1, len(incident)):
-                                g.add_clause([-variables[edge_nums[incident[i]], c], -variables[edge_nums[incident[j]], c]])
-
+        while colors_count <= upper_bound:
             # Try to get solution
-            if g.solve():
-                solution = g.get_model()
-                fill_colors(graph, solution, color_values, variables, edge_nums)
-                if validate_solution(graph):
-                    solution_found = True
-                    break
-
-            starting_at += chunk_size
-
-    fill_colors(graph, solution, color_values, variables, edge_nums)
-    return colors_count
+            if tried != colors_count:
+                tried = colors_count
+                stats.count("colors_tried")
+            stats.count("rounds")
+            with stats.phase("solve"):
+                result = solve_until(g, color_assumptions(selectors, colors_count), solver, deadline)
+            if result is None:
+                timed_out = True
+                break
+            if not result:
+                # Adding more constraints can't help, try more colors
+                colors_count += 1
+                continue
+
+            with stats.phase("decode"):
+                node_colors, edge_colors = fill_colors(total, g.get_model(), upper_bound, encoding)
+            with stats.phase("validate"):
+                valid = total_validate.validate(node_colors, edge_colors, total.edges)
+                if not valid:
+                    conflicts = [tuple(pair) for pair in
+                                 total_validate.edge_conflicts(edge_colors, total.edges).tolist()]
+            if valid:
+                stats.record_sat(g)
+                g.delete()
+                with stats.phase("decode"):
+                    total.assign(node_colors, edge_colors, "optimal", write_back)
+                return colors_count
+
+            # The edges of the node have the same color, at most one of them can have the color
+            with stats.phase("encode"):
+                learned.update(conflicts)
+                add_learned_clauses(g, total, conflicts, upper_bound, pool, amo, encoding)
+
+        # Not colorable within the upper bound, encode the problem again with more colors
+        stats.record_sat(g)
+        g.delete()
+        upper_bound += 1
+
+    # The heuristic coloring was optimal or the time ran out
+    with stats.phase("decode"):
+        total.assign(best[1], best[2], "feasible" if timed_out else "optimal", write_back)
+    return best[0]
 
 
 # Finds total chromatic index and assigns color to each node and edge
-def total_coloring(graph: networkx.Graph):
+# the graph is a NetworkX graph or TotalGraph, the colors are written to the NetworkX graph with write_back,
+# with cnf_dir the formulas are stored there in DIMACS files and loaded from them by the next runs,
+# the phases, the formula and the search are measured in stats, the colors are encoded by the encoding
+# from color_encoding (direct, order, log or auto), the solvers in UNINTERRUPTIBLE ignore the timeout
+# during a call and are only stopped between the calls
+def total_coloring(graph, amo="pairwise", symmetry=False, precedence=False, heuristic=False,
+                   solver="glucose3", timeout=None, write_back=True, cnf_dir=None, stats=None, encoding="direct",
+                   bounds=True):
     # Initiate
-    max_deg = 0
-    for node in graph.nodes:
-        max_deg = max(max_deg, graph.degree[node])
-    colors_count = max_deg
-
-    edge_nums = {}
-    edge_num = len(graph.nodes)
-    edge_nums_values = []
-    for e in graph.edges:
-        edge_nums[e[0], e[1]] = edge_num
-        edge_nums[e[1], e[0]] = edge_num
-        edge_nums_values.append(edge_num)
-        edge_num += 1
-
-    solution_found = False
-    solution = []
-
-    color_values = []
-    variables = {}
+    stats = Stats() if stats is None else stats
+    with stats.phase("encode"):
+        total = TotalGraph.of(graph)
+        encoding = resolve_encoding(total, encoding)
+    max_deg = total.max_degree
 
-    # Search for solution with the given amount of colors (lower bound is max_degree + 1)
-    while not solution_found:
-        colors_count += 1
-        color_values = [c + 1 for c in range(colors_count)]
+    # The problem is encoded once for the upper bound and the colors above the currently
+    # tried amount are disabled by assumptions, so the learned clauses are kept between the rounds
+    colors_count, upper_bound, best, deadline = total_search.search_range(total, heuristic, timeout, stats, bounds)
+    timed_out = False
 
+    # Search for solution with the given amount of colors (lower bound is max_degree + 1)
+    while not timed_out and (best is None or colors_count < best[0]):
         # Define problem
-        g = Glucose3()
-
-        # Define variables
-        cnt = 0
-        variables = {}
-        for v in graph.nodes:
-            for c in color_values:
-                variables[(v, c)] = cnt * colors_count + c
-            cnt += 1
-        for e in edge_nums_values:
-            for c in color_values:
-                variables[(e, c)] = cnt * colors_count + c
-            cnt += 1
-
-        for v in graph.nodes:
-            # Constraint - At least 1 color for each node
-            g.add_clause([variables[v, c] for c in color_values])
-
-            # Constraint - At most 1 color for each node
-            for i in range(len(color_values) - 1):
-                for j in range(i + 1, len(color_values)):
-                    g.add_clause([-variables[v, color_values[i]], -variables[v, color_values[j]]])
-
-            # Constraint - Different color for each pair of edges sharing a node
-            incident = [e for e in graph.edges(v)]
-            for c in color_values:
-                if len(incident) > 1:
-                    for i in range(len(incident) - 1):
-                        for j in range(i + 1, len(incident)):
-                            g.add_clause([-variables[edge_nums[incident[i]], c], -variables[edge_nums[incident[j]], c]])
-
-        for e0, e1 in graph.edges:
-            e = edge_nums[e0, e1]
-            # Constraint - At least 1 color for each edge
-            g.add_clause([variables[e, c] for c in color_values])
-
-            # Constraint - At least 1 color for each edge
-            for i in range(len(color_values) - 1):
-                for j in range(i + 1, len(color_values)):
-                    g.add_clause([-variables[e, color_values[i]], -variables[e, color_values[j]]])
-
-            # Constraint - Different color for each (edge, v, u)
-            for c in color_values:
-                g.add_clause([-variables[e0, c], -variables[e1, c]])
-                g.add_clause([-variables[e0, c], -variables[e, c]])
-                g.add_clause([-variables[e1, c], -variables[e, c]])
-
-        # Get solution
-        if g.solve():
-            solution_found = True
-            solution = g.get_model()
-
-    solution = [x for x in solution if x > 0]
-    for u in graph.nodes():
-        node_col = -1
-        for c in color_values:
-            var_num = variables[u, c]
-            if binary_search(solution, var_num) is not None:
-                node_col = c
-                break
-        graph.nodes[u]["color"] = node_col - 1
-    for u, v in graph.edges():
-        edge_col = -1
-        for c in color_values:
-            var_num = variables[edge_nums[u, v], c]
-            if binary_search(solution, var_num) is not None:
-                edge_col = c
+        with stats.phase("encode"):
+            selectors, pool = define_variables(total, upper_bound, max_deg + 2, encoding)
+            g = Solver(name=solver)
+            path = None
+            if cnf_dir is not None:
+                path = total_cnf.dimacs_path(cnf_dir, total, upper_bound, max_deg + 2, amo, symmetry, precedence,
+                                             encoding)
+            if path is not None and os.path.exists(path):
+                batches = total_cnf.read_dimacs(path)[1]
+            else:
+                batches = total_cnf.formula_batches(total, upper_bound, selectors, pool, amo, symmetry, precedence,
+                                                    encoding)
+                if path is not None:
+                    batches = total_cnf.write_dimacs(path, batches, lambda: pool.top)
+            total_cnf.add_batches(g, batches)
+
+        while colors_count <= upper_bound:
+            # Get solution
+            stats.count("colors_tried")
+            with stats.phase("solve"):
+                result = solve_until(g, color_assumptions(selectors, colors_count), solver, deadline)
+            if result is None:
+                timed_out = True
                 break
-        graph.edges[u, v]["color"] = edge_col - 1
-    return colors_count
+            if result:
+                stats.record_sat(g)
+                with stats.phase("decode"):
+                    node_colors, edge_colors = fill_colors(total, g.get_model(), upper_bound, encoding)
+                    g.delete()
+                    total.assign(node_colors, edge_colors, "optimal", write_back)
+                return colors_count
+            colors_count += 1
+
+        # Not colorable within the upper bound, encode the problem again with more colors
+        stats.record_sat(g)
+        g.delete()
+        upper_bound += 1
+
+    # The heuristic coloring was optimal or the time ran out
+    with stats.phase("decode"):
+        total.assign(best[1], best[2], "feasible" if timed_out else "optimal", write_back)
+    return best[0]
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+import time
+from total_graph import TotalGraph, NULL_GRAPH_COLORS
+import total_bounds
+import total_heuristic
+import total_vizing
+
+# Range of the amounts of colors searched by the exact modes (SAT and CSP) and the warm start coloring
+# which bounds the search and is returned when the time runs out.
+
+
+# Coloring which bounds the search of the exact modes, the better one of DSATUR and the constructive coloring
+# in the format of total_heuristic.dsatur, the graph is a NetworkX graph or TotalGraph
+def warm_start(graph, deadline=None):
+    total = TotalGraph.of(graph)
+    best = total_heuristic.dsatur(total)
+    if best[0] > total.max_degree + 1:
+        constructed = total_vizing.coloring(total, deadline)
+        if constructed[0] < best[0]:
+            return constructed
+    return best
+
+
+# Range of the amounts of colors searched by the exact modes, returns the lower bound (max degree + 1 raised
+# by total_bounds with bounds), the upper bound (max degree + 2 or one color less than the warm start),
+# the warm start and the deadline. The warm start (with heuristic or timeout) bounds the search, only
+# the lower amounts of colors are tried, and with timeout it is the coloring returned when the time runs out
+def search_range(total, heuristic, timeout, stats, bounds=True):
+    lower_bound = total.max_degree + 1
+    if bounds:
+        with stats.phase("bounds"):
+            lower_bound = max(lower_bound, total_bounds.lower_bound(total)[0])
+    upper_bound = total.max_degree + 2
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    best = None
+    if heuristic or deadline is not None:
+        with stats.phase("heuristic"):
+            best = warm_start(total, deadline)
+        best = (max(best[0], NULL_GRAPH_COLORS),) + tuple(best[1:])
+        upper_bound = min(upper_bound, best[0] - 1)
+    return lower_bound, upper_bound, best, deadline
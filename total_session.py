@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+
+import collections
+import networkx
+from pysat.solvers import Solver
+from total_graph import NULL_GRAPH_COLORS
+import total_sat as sat_solver
+from total_stats import Stats
+
+# Total coloring of a graph which changes by a few nodes and edges at a time. The session keeps the coloring
+# on the attributes of the graph and after each change repairs only the elements around it: a free color
+# first, then swapping a Kempe chain of two colors, then SAT on a growing neighborhood with the rest of
+# the coloring frozen. The whole graph is solved again only when the palette must grow or can shrink
+# (the max degree changes) or the repair fails, so the time of an update depends on the size of the change.
+#
+# The elements are ("node", u) and ("edge", frozenset((u, v))).
+
+# Largest Kempe chain which is swapped, longer chains are left for the SAT repair
+MAX_CHAIN = 64
+# Radius of the neighborhood freed by the first SAT repair, it doubles up to MAX_RADIUS
+FIRST_RADIUS = 1
+MAX_RADIUS = 8
+
+
+class ColoringSession:
+    # The graph is colored from scratch by solve, the optimal SAT coloring by default
+    def __init__(self, graph=None, solve=None, solver="glucose3", stats=None):
+        self.graph = networkx.Graph() if graph is None else graph
+        self.solve = sat_solver.total_coloring if solve is None else solve
+        self.solver = solver
+        self.stats = Stats() if stats is None else stats
+        self.colors_count = 0
+        self.max_degree = -1
+        # Amounts of nodes by their degree, kept by the updates so the max degree isn't searched over all nodes
+        self.degrees = collections.Counter()
+        self.recolor()
+
+    # Status of the current coloring, optimal or feasible
+    @property
+    def status(self):
+        return self.graph.graph.get("status", "optimal")
+
+    # Colors the whole graph again
+    def recolor(self):
+        self.stats.count("global")
+        with self.stats.phase("global"):
+            if self.graph.number_of_nodes() == 0:
+                self.colors_count = NULL_GRAPH_COLORS
+                self.graph.graph["status"] = "optimal"
+            else:
+                self.colors_count = self.solve(self.graph)
+        self.degrees = collections.Counter(d for _, d in self.graph.degree)
+        self.max_degree = max(self.degrees, default=-1)
+        return self.colors_count
+
+    # Alias of recolor, used to get an optimal coloring after the removals left a feasible one
+    def optimize(self):
+        return self.recolor()
+
+    # Max degree after removals, the degrees only dropped so it is found going down from the previous one
+    def current_max_degree(self):
+        d = self.max_degree
+        while d >= 0 and self.degrees[d] == 0:
+            d -= 1
+        return d
+
+    # Moves the node of the old degree to the new one in the amounts of nodes by degree
+    def change_degree(self, old, new):
+        self.degrees[old] -= 1
+        self.degrees[new] += 1
+
+    # Adds the node with its edges to the existing nodes
+    def add_node(self, u, neighbors=()):
+        if u not in self.graph:
+            self.graph.add_node(u, color=0)
+            self.degrees[0] += 1
+            self.max_degree = max(self.max_degree, 0)
+        for v in neighbors:
+            self.add_edge(u, v)
+        return self.colors_count
+
+    # Removes the node and its edges, the coloring stays proper
+    def remove_node(self, u):
+        for w in self.graph.adj[u]:
+            self.change_degree(self.graph.degree[w], self.graph.degree[w] - 1)
+        self.degrees[self.graph.degree[u]] -= 1
+        self.graph.remove_node(u)
+        return self.after_removal()
+
+    # Adds the edge, the nodes which aren't in the graph are added as well
+    def add_edge(self, u, v):
+        if u == v:
+            raise ValueError("Loops can't be totally colored")
+        for w in (u, v):
+            self.add_node(w)
+        if self.graph.has_edge(u, v):
+            return self.colors_count
+        self.graph.add_edge(u, v)
+        for w in (u, v):
+            self.change_degree(self.graph.degree[w] - 1, self.graph.degree[w])
+
+        # The palette must grow, the optimal amount of colors isn't known
+        max_degree = max(self.max_degree, self.graph.degree[u], self.graph.degree[v])
+        if max_degree + 1 > self.colors_count:
+            return self.recolor()
+        self.max_degree = max_degree
+
+        # The new edge has no color and the nodes may have the same one
+        broken = [("edge", frozenset((u, v)))]
+        if self.graph.nodes[u]["color"] == self.graph.nodes[v]["color"]:
+            self.graph.nodes[v]["color"] = None
+            broken.append(("node", v))
+        return self.repair(broken)
+
+    # Removes the edge, the coloring stays proper
+    def remove_edge(self, u, v):
+        self.graph.remove_edge(u, v)
+        for w in (u, v):
+            self.change_degree(self.graph.degree[w] + 1, self.graph.degree[w])
+        return self.after_removal()
+
+    # The coloring of a subgraph stays proper, but it can need fewer colors when the max degree drops
+    def after_removal(self):
+        max_degree = self.current_max_degree()
+        if max_degree < self.max_degree:
+            return self.recolor()
+        if self.colors_count > max_degree + 1:
+            self.graph.graph["status"] = "feasible"
+        return self.colors_count
+
+    # Neighbors of the element in the total graph
+    def neighbors(self, x):
+        kind, item = x
+        adjacency = self.graph.adj
+        if kind == "node":
+            return [("node", w) for w in adjacency[item]] + [("edge", frozenset((item, w))) for w in adjacency[item]]
+        u, v = tuple(item)
+        return [("node", u), ("node", v)] + [("edge", frozenset((u, w))) for w in adjacency[u] if w != v] + \
+            [("edge", frozenset((v, w))) for w in adjacency[v] if w != u]
+
+    def color(self, x):
+        kind, item = x
+        if kind == "node":
+            return self.graph.nodes[item]["color"]
+        return self.graph.edges[tuple(item)].get("color")
+
+    def set_color(self, x, c):
+        kind, item = x
+        if kind == "node":
+            self.graph.nodes[item]["color"] = c
+        else:
+            self.graph.edges[tuple(item)]["color"] = c
+
+    # Colors the elements without color by the same amount of colors, a supergraph can't need fewer colors
+    # so the status stays the same unless the amount reached the lower bound
+    def repair(self, broken):
+        if self.colors_count == self.max_degree + 1:
+            self.graph.graph["status"] = "optimal"
+
+        pending = []
+        for x in broken:
+            if not self.free_color(x):
+                pending.append(x)
+        if not pending:
+            self.stats.count("free")
+            return self.colors_count
+
+        pending = [x for x in pending if not self.kempe_color(x)]
+        if not pending:
+            self.stats.count("kempe")
+            return self.colors_count
+
+        radius = FIRST_RADIUS
+        while radius <= MAX_RADIUS:
+            with self.stats.phase("local"):
+                solved, whole = self.local_sat(pending, radius)
+            if solved:
+                self.stats.count("local_sat")
+                return self.colors_count
+            if whole:
+                break
+            radius *= 2
+        return self.recolor()
+
+    # Gives the element the lowest color not used by its neighbors
+    def free_color(self, x):
+        used = {self.color(y) for y in self.neighbors(x)}
+        for c in range(self.colors_count):
+            if c not in used:
+                self.set_color(x, c)
+                return True
+        return False
+
+    # Elements connected to the start by the elements with colors a and b, None when there are more than MAX_CHAIN
+    def kempe_chain(self, start, a, b):
+        chain = {start}
+        queue = collections.deque([start])
+        while queue:
+            x = queue.popleft()
+            for y in self.neighbors(x):
+                if y not in chain and self.color(y) in (a, b):
+                    chain.add(y)
+                    if len(chain) > MAX_CHAIN:
+                        return None
+                    queue.append(y)
+        return chain
+
+    # Frees a color for the element by swapping the colors a and b on the chains of its neighbors with color a,
+    # the swap is undone when the chains reach a neighbor with color b
+    def kempe_color(self, x):
+        for a in range(self.colors_count):
+            blocking = [y for y in self.neighbors(x) if self.color(y) == a]
+            for b in range(self.colors_count):
+                if b == a:
+                    continue
+                chains = set()
+                for y in blocking:
+                    if y not in chains:
+                        chain = self.kempe_chain(y, a, b)
+                        if chain is None:
+                            break
+                        chains |= chain
+                else:
+                    for y in chains:
+                        self.set_color(y, b if self.color(y) == a else a)
+                    if all(self.color(y) != a for y in self.neighbors(x)):
+                        self.set_color(x, a)
+                        return True
+                    for y in chains:
+                        self.set_color(y, b if self.color(y) == a else a)
+        return False
+
+    # Colors the elements within the radius around the broken ones by SAT with the other elements frozen,
+    # returns whether it was solved and whether the neighborhood covered the whole component
+    def local_sat(self, broken, radius):
+        free = {x: 0 for x in broken}
+        frontier = list(broken)
+        for distance in range(1, radius + 1):
+            following = []
+            for x in frontier:
+                for y in self.neighbors(x):
+                    if y not in free:
+                        free[y] = distance
+                        following.append(y)
+            frontier = following
+        whole = not frontier
+
+        k = self.colors_count
+        index = {x: i for i, x in enumerate(free)}
+        clauses = []
+        for x, i in index.items():
+            variables = [i * k + c + 1 for c in range(k)]
+            clauses.append(variables)
+            clauses += [[-variables[c], -variables[d]] for c in range(k) for d in range(c + 1, k)]
+            for y in self.neighbors(x):
+                if y in index:
+                    if index[y] > i:
+                        clauses += [[-(i * k + c + 1), -(index[y] * k + c + 1)] for c in range(k)]
+                elif self.color(y) is not None:
+                    clauses.append([-(i * k + self.color(y) + 1)])
+
+        with Solver(name=self.solver, bootstrap_with=clauses) as g:
+            if not g.solve():
+                return False, whole
+            model = g.get_model()
+        for x, i in index.items():
+            self.set_color(x, next(c for c in range(k) if model[i * k + c] > 0))
+        return True, whole
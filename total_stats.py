@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+from contextlib import contextmanager
+import time
+
+# Counters which hold the largest value seen instead of the sum, the size of the biggest formula
+MAXIMA = {"clauses", "variables"}
+
+
+# Measurements of a solver run, the time of each phase (encode, solve, decode, validate, heuristic, ...)
+# is summed over all the times the phase was entered. The counters hold the size of the largest formula
+# (clauses and variables), the search statistics of the solvers (conflicts, decisions, propagations, restarts),
+# the amounts of colors tried and the rounds of the iterative modes
+class Stats:
+    def __init__(self):
+        self.phases = {}
+        self.counters = {}
+
+    # Measures the time spent in the block as the given phase
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    # Adds the amount to the counter, the counters in MAXIMA keep the largest amount instead
+    def count(self, name: str, amount=1):
+        if name in MAXIMA:
+            self.counters[name] = max(self.counters.get(name, 0), amount)
+        else:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    # Records the formula and the search statistics of the pysat solver, called before it is deleted
+    def record_sat(self, g):
+        self.count("clauses", g.nof_clauses())
+        self.count("variables", g.nof_vars())
+        for name, amount in (g.accum_stats() or {}).items():
+            self.count(name, amount)
+
+    # Records the constraints and the search statistics of the CSP engine after each search
+    def record_csp(self, solver):
+        self.count("clauses", len(solver.cliques))
+        self.count("variables", len(solver.initial))
+        self.count("decisions", solver.decisions)
+        self.count("conflicts", solver.conflicts)
+
+    # Adds the measurements of another run, used to sum the runs on several graphs
+    def merge(self, other):
+        for name, elapsed in other.phases.items():
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+        for name, amount in other.counters.items():
+            self.count(name, amount)
+
+    # Printable summary of the measurements
+    def report(self) -> str:
+        phases = ", ".join("{} {:.4f}s".format(name, elapsed) for name, elapsed in sorted(self.phases.items()))
+        counters = ", ".join("{} {}".format(name, amount) for name, amount in sorted(self.counters.items()))
+        return "Phases: {}\nCounters: {}".format(phases or "none", counters or "none")
@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 
 import networkx
-import total_sat as sat_solver
-import total_csp as csp_solver
-import matplotlib.pyplot as plt
+import total_decompose as decomposition
+import total_families
+import total_modes
 import coloring
+import total_validate
 import time
+from total_stats import Stats
 
 
 # Validates the graph
@@ -17,23 +19,24 @@ def verify_total_coloring(graph, expected_colors, colors) -> str:
         if "color" not in graph.edges[u, v]:
             return f"Edge {u,v} has no assigned color."
 
-    for u, v in graph.edges():
-        if graph.nodes[u]["color"] == graph.nodes[v]["color"]:
-            c = graph.nodes[v]["color"]
-            return f"Vertices {u} and {v} have the same color {c}."
-        if graph.nodes[u]["color"] == graph.edges[u, v]["color"]:
-            c = graph.nodes[u]["color"]
-            return f"Vertex {u} and edge {u,v} have the same color {c}."
-        if graph.nodes[v]["color"] == graph.edges[u, v]["color"]:
-            c = graph.nodes[v]["color"]
-            return f"Vertex {v} and edge {u,v} have the same color {c}."
-
-    for u in graph.nodes():
-        for v in graph[u]:
-            for w in graph[u]:
-                if v != w and graph.edges[u, v]["color"] == graph.edges[u, w]["color"]:
-                    c = graph.edges[u, v]["color"]
-                    return f"Edges {u,v} and {u,w} have the same color {c}."
+    nodes = list(graph.nodes)
+    edges = list(graph.edges)
+    node_colors, edge_colors = total_validate.color_arrays(graph)
+    violation = total_validate.find_violation(node_colors, edge_colors, total_validate.edge_array(graph))
+
+    if violation is not None and violation[0] == "vertices":
+        u, v = edges[violation[1]]
+        c = graph.nodes[v]["color"]
+        return f"Vertices {u} and {v} have the same color {c}."
+    if violation is not None and violation[0] == "vertex_edge":
+        u, v = edges[violation[1]]
+        w = nodes[violation[2]]
+        c = graph.nodes[w]["color"]
+        return f"Vertex {w} and edge {u,v} have the same color {c}."
+    if violation is not None and violation[0] == "edges":
+        e, f = edges[violation[2]], edges[violation[3]]
+        c = graph.edges[e]["color"]
+        return f"Edges {e} and {f} have the same color {c}."
 
     if colors != expected_colors and expected_colors is not None:
         return f"The number of colors {colors} differs from the expected {expected_colors}."
@@ -50,70 +53,109 @@ def get_layout(graph, name: str):
     return networkx.circular_layout(graph)
 
 
-# Runs the tests and plots the results
-def total_coloring_test(name: str, mode: str, graph, expected_colors, draw: bool) -> (bool, time):
+# Function coloring the graph by the mode with the given options or None for unknown mode,
+# the times of the phases are measured in stats, the modes are registered in total_modes
+def solver_for(mode: str, amo: str = "pairwise", symmetry: bool = False, precedence: bool = False,
+               heuristic: bool = False, workers: int = None, timeout: float = None, cnf_dir: str = None, stats=None,
+               encoding: str = "direct"):
+    return total_modes.solver_for(mode, amo=amo, symmetry=symmetry, precedence=precedence, heuristic=heuristic,
+                                  workers=workers, timeout=timeout, cnf_dir=cnf_dir, stats=stats, encoding=encoding)
+
+
+# Runs the tests and plots the results, the solver and the validation are measured in stats
+def total_coloring_test(name: str, mode: str, graph, expected_colors, draw: bool, amo: str = "pairwise",
+                        symmetry: bool = False, precedence: bool = False, heuristic: bool = False,
+                        decompose: bool = False, workers: int = None, cache=None,
+                        families: bool = False, timeout: float = None, cnf_dir: str = None,
+                        stats=None, encoding: str = "direct") -> (bool, time):
     print("Test: {}".format(name))
 
-    if mode == "SAT":
-        start = time.time()
-        colors = sat_solver.total_coloring(graph)
-        end = time.time()
-    elif mode == "CSP":
-        start = time.time()
-        colors = csp_solver.total_coloring(graph)
-        end = time.time()
-    elif mode == "CSP_iterative":
-        start = time.time()
-        colors = csp_solver.total_coloring_iterative(graph)
-        end = time.time()
-    elif mode == "SAT_iterative":
-        start = time.time()
-        colors = sat_solver.total_coloring_iterative(graph)
-        end = time.time()
-    else:
+    stats = Stats() if stats is None else stats
+    solve = solver_for(mode, amo, symmetry, precedence, heuristic, workers, timeout, cnf_dir, stats, encoding)
+    if solve is None:
         return False, None
 
-    result = verify_total_coloring(graph, expected_colors, colors)
+    # The same graph may be colored by several modes
+    graph.graph.pop("engine", None)
+    graph.graph.pop("status", None)
+    graph.graph.pop("lower_bound", None)
+
+    start = time.time()
+    colors = None
+    if cache is not None:
+        colors = cache.lookup(graph)
+    cached = colors is not None
+    if cached:
+        print("Cache hit")
+        graph.graph["status"] = "optimal"
+    if colors is None and families:
+        family, colors = total_families.total_coloring(graph)
+        if family is not None:
+            print("Closed form for {} graph".format(family))
+    if colors is None and decompose:
+        colors = decomposition.total_coloring(graph, solve, workers, timeout)
+    elif colors is None:
+        colors = solve(graph)
+    end = time.time()
+
+    if "engine" in graph.graph:
+        print("Won by {}".format(graph.graph["engine"]))
+
+    # Coloring which isn't proven optimal (time ran out or local search) doesn't have to use
+    # the expected amount of colors
+    status = graph.graph.get("status", "optimal")
+    if status != "optimal":
+        print("Optimality not proven, the coloring is {}".format(status))
+        if "lower_bound" in graph.graph:
+            print("Lower bound {}, at most {} colors more".format(graph.graph["lower_bound"],
+                                                                 colors - graph.graph["lower_bound"]))
+        expected_colors = None
+    with stats.phase("validate"):
+        result = verify_total_coloring(graph, expected_colors, colors)
 
     if result:
         print("Failed: {}".format(result))
         return False, None
     else:
         print("Colored with {} colors".format(colors))
+        if cache is not None and not cached and status == "optimal":
+            cache.store(graph, colors)
         if draw:
             node_coloring, edge_coloring = coloring.get_graph_colors(graph)
             networkx.draw(graph, node_color=node_coloring, edge_color=edge_coloring, width=1.5, pos=get_layout(graph, name))
-            plt.show()
+            # The plotting stack is imported only when a graph is drawn
+            total_modes.load("matplotlib.pyplot").show()
         return True, (end - start)
 
 
 # Driver code for tests
-def run_tests(mode: str, draw: bool) -> bool:
-    success, time_elapsed = total_coloring_test("Complete graph on 3 vertices", mode, networkx.complete_graph(3), 3, draw)
+# the options are passed to each test
+def run_tests(mode: str, draw: bool, **options) -> bool:
+    success, time_elapsed = total_coloring_test("Complete graph on 3 vertices", mode, networkx.complete_graph(3), 3, draw, **options)
     if not success:
         return False
 
-    success, time_elapsed = total_coloring_test("Complete graph on 5 vertices", mode, networkx.complete_graph(5), 5, draw)
+    success, time_elapsed = total_coloring_test("Complete graph on 5 vertices", mode, networkx.complete_graph(5), 5, draw, **options)
     if not success:
         return False
 
-    success, time_elapsed = total_coloring_test("Cycle of length 5", mode, networkx.cycle_graph(5), 4, draw)
+    success, time_elapsed = total_coloring_test("Cycle of length 5", mode, networkx.cycle_graph(5), 4, draw, **options)
     if not success:
         return False
 
-    success, time_elapsed = total_coloring_test("Star graph on 5 vertices", mode, networkx.star_graph(4), 5, draw)
+    success, time_elapsed = total_coloring_test("Star graph on 5 vertices", mode, networkx.star_graph(4), 5, draw, **options)
     if not success:
         return False
 
-    success, time_elapsed = total_coloring_test("Cycle of length 14", mode, networkx.cycle_graph(14), 4, draw)
+    success, time_elapsed = total_coloring_test("Cycle of length 14", mode, networkx.cycle_graph(14), 4, draw, **options)
     if not success:
         return False
 
-    success, time_elapsed = total_coloring_test("Star graph on 50 vertices", mode, networkx.star_graph(50), 51, draw)
+    success, time_elapsed = total_coloring_test("Star graph on 50 vertices", mode, networkx.star_graph(50), 51, draw, **options)
     if not success:
         return False
 
-    success, time_elapsed = total_coloring_test("Complete bipartite graph on 4+4 vertices", mode, networkx.complete_multipartite_graph(4, 4), 6, draw)
+    success, time_elapsed = total_coloring_test("Complete bipartite graph on 4+4 vertices", mode, networkx.complete_multipartite_graph(4, 4), 6, draw, **options)
     if not success:
         return False
 
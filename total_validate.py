@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import numpy
+
+# Validation of total colorings on arrays, the nodes are numbered 0..n-1 in the order of graph.nodes
+# and edges 0..m-1 in the order of graph.edges, edges holds the (u, v) node numbers of each edge
+
+
+# Array of the (u, v) node numbers of each edge
+def edge_array(graph):
+    node_nums = {u: i for i, u in enumerate(graph.nodes)}
+    edges = numpy.array([(node_nums[u], node_nums[v]) for u, v in graph.edges], dtype=numpy.int64)
+    return edges.reshape(-1, 2)
+
+
+# Arrays of the node and edge colors assigned to the graph
+def color_arrays(graph):
+    node_colors = numpy.array([graph.nodes[u]["color"] for u in graph.nodes], dtype=numpy.int64)
+    edge_colors = numpy.array([graph.edges[e]["color"] for e in graph.edges], dtype=numpy.int64)
+    return node_colors, edge_colors
+
+
+# Assigns the colors of nodes and edges to the graph
+def assign_colors(graph, node_colors, edge_colors):
+    for u, col in zip(graph.nodes(), numpy.asarray(node_colors).tolist()):
+        graph.nodes[u]["color"] = col
+    for (u, v), col in zip(graph.edges(), numpy.asarray(edge_colors).tolist()):
+        graph.edges[u, v]["color"] = col
+
+
+# Finds the first broken rule of total coloring, returns None for a valid coloring or one of
+# ("vertices", edge) - the endpoints of the edge have the same color
+# ("vertex_edge", edge, node) - the edge and its endpoint have the same color
+# ("edges", node, edge, edge) - the edges sharing the node have the same color
+def find_violation(node_colors, edge_colors, edges):
+    node_colors = numpy.asarray(node_colors)
+    edge_colors = numpy.asarray(edge_colors)
+    u, v = edges[:, 0], edges[:, 1]
+
+    same = numpy.flatnonzero(node_colors[u] == node_colors[v])
+    if len(same):
+        return "vertices", int(same[0])
+
+    for ends in (u, v):
+        same = numpy.flatnonzero(node_colors[ends] == edge_colors)
+        if len(same):
+            return "vertex_edge", int(same[0]), int(ends[same[0]])
+
+    # Each edge is listed at both its endpoints, after sorting by (node, color) the edges
+    # of a node with the same color are next to each other
+    nodes = numpy.concatenate((u, v))
+    colors = numpy.concatenate((edge_colors, edge_colors))
+    order = numpy.lexsort((colors, nodes))
+    nodes, colors = nodes[order], colors[order]
+    same = numpy.flatnonzero((nodes[1:] == nodes[:-1]) & (colors[1:] == colors[:-1]))
+    if len(same):
+        i = same[0]
+        m = len(edge_colors)
+        return "edges", int(nodes[i]), int(order[i] % m), int(order[i + 1] % m)
+    return None
+
+
+# Nodes at which some edges have the same color, returns the array of distinct (node, color) pairs
+def edge_conflicts(edge_colors, edges):
+    colors = numpy.concatenate((edge_colors, edge_colors))
+    pairs = numpy.stack((numpy.concatenate((edges[:, 0], edges[:, 1])), colors), axis=1)
+    pairs, counts = numpy.unique(pairs.reshape(-1, 2), axis=0, return_counts=True)
+    return pairs[counts > 1]
+
+
+# Checks all three rules of total coloring
+def validate(node_colors, edge_colors, edges):
+    return find_violation(node_colors, edge_colors, edges) is None
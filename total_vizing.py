@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+
+import heapq
+import random
+import time
+from total_graph import TotalGraph, NULL_GRAPH_COLORS
+import total_bounds
+import total_local
+import total_validate
+from total_stats import Stats
+
+# Constructive total coloring in polynomial time, the edges are colored by Misra-Gries algorithm
+# with max_degree + 1 colors (Vizing's theorem), then every node takes one of max_degree + 2 colors which
+# isn't on its edges nor on its colored neighbors. The nodes left without such color get new colors greedily,
+# so the coloring uses at most max_degree + 2 + (max degree among the left nodes) + 1 colors, max_degree + 2
+# when no node is left. These nodes are then repaired by tabu search with max_degree + 2 colors and finally
+# the elements of the highest colors are moved to lower free colors where possible.
+
+# Iterations of the tabu search repairing the nodes with new colors, 20 more for each such node
+REPAIR_ITERATIONS = 10000
+
+# Longest path of two edge colors which is swapped to free a color for a node
+MAX_PATH = 1000
+
+
+# Edge coloring by Misra-Gries algorithm with max_degree + 1 colors, returns the colors of the edges
+def edge_coloring(total):
+    n, ends = total.n, total.edges.tolist()
+    palette = total.max_degree + 1
+    colors = [-1] * total.m
+    # The edge of the node with the color
+    at = [{} for _ in range(n)]
+
+    def other(e, x):
+        u, v = ends[e]
+        return v if u == x else u
+
+    def free(x):
+        c = 0
+        while c in at[x]:
+            c += 1
+        return c
+
+    def clear(e):
+        u, v = ends[e]
+        if colors[e] != -1:
+            del at[u][colors[e]]
+            del at[v][colors[e]]
+            colors[e] = -1
+
+    def set_color(e, c):
+        u, v = ends[e]
+        colors[e] = c
+        at[u][c] = e
+        at[v][c] = e
+
+    for e, (u, v) in enumerate(ends):
+        # Color free at both endpoints
+        c = next((c for c in range(palette) if c not in at[u] and c not in at[v]), None)
+        if c is not None:
+            set_color(e, c)
+            continue
+
+        # Maximal fan of u starting with v, the edge to the next node has a color free on the previous node
+        fan = [v]
+        edges = [e]
+        in_fan = {v}
+        while True:
+            d = free(fan[-1])
+            f = at[u].get(d)
+            if f is None or other(f, u) in in_fan:
+                break
+            fan.append(other(f, u))
+            edges.append(f)
+            in_fan.add(fan[-1])
+
+        # Inverts the path of colors c and d from u, after that d is free on u
+        c = free(u)
+        d = free(fan[-1])
+        path = []
+        x, current = u, d
+        while current in at[x]:
+            f = at[x][current]
+            path.append(f)
+            x = other(f, x)
+            current = c if current == d else d
+        swapped = [c if colors[f] == d else d for f in path]
+        for f in path:
+            clear(f)
+        for f, color in zip(path, swapped):
+            set_color(f, color)
+
+        # The prefix of the fan up to the first node with free d is still a fan, it is rotated
+        # and the edge to its last node gets d
+        w = None
+        for i, x in enumerate(fan):
+            if i > 0 and colors[edges[i]] in at[fan[i - 1]]:
+                break
+            if d not in at[x]:
+                w = i
+                break
+        if w is None:
+            raise RuntimeError("Misra-Gries fan without free color")
+        rotated = [colors[edges[i + 1]] for i in range(w)] + [d]
+        for f in edges[:w + 1]:
+            clear(f)
+        for f, color in zip(edges, rotated):
+            set_color(f, color)
+
+    return colors
+
+
+# Colors of the nodes, a color from palette missing among the edges and the neighbors where possible,
+# the nodes are chosen by DSATUR on these lists. A node without such color is colored after recoloring
+# its neighbors to other free colors or after swapping a path of two edge colors (the edge colors
+# are changed in place), the remaining nodes get new colors from palette on. Returns the colors of the nodes
+def node_coloring(total, edge_colors, palette):
+    offsets = total.offsets.tolist()
+    incident = total.incident.tolist()
+    adjacent = total.adjacent.tolist()
+    colors = [-1] * total.n
+    lists = []
+    for u in range(total.n):
+        used = {edge_colors[e] for e in incident[offsets[u]:offsets[u + 1]]}
+        lists.append([c for c in range(palette) if c not in used])
+    # Colors of the colored neighbors for each node
+    blocked = [set() for _ in range(total.n)]
+
+    def options(u):
+        return [c for c in lists[u] if c not in blocked[u]]
+
+    left = []
+    heap = [(len(lists[u]), u) for u in range(total.n)]
+    heapq.heapify(heap)
+    while heap:
+        count, u = heapq.heappop(heap)
+        # Outdated entry, the node has been colored or lost some of its options
+        if colors[u] != -1 or count != len(options(u)):
+            continue
+        available = options(u)
+        if not available:
+            left.append(u)
+            colors[u] = -2
+            continue
+        colors[u] = available[0]
+        for w in adjacent[offsets[u]:offsets[u + 1]]:
+            if colors[w] == -1 and colors[u] not in blocked[w]:
+                blocked[w].add(colors[u])
+                heapq.heappush(heap, (len(options(w)), w))
+
+    # The neighbors blocking a color of the left node move to other colors free on them
+    def neighbor_colors(w):
+        return {colors[x] for x in adjacent[offsets[w]:offsets[w + 1]]}
+
+    ends = total.edges.tolist()
+    at = [{edge_colors[e]: e for e in incident[offsets[u]:offsets[u + 1]]} for u in range(total.n)]
+
+    # Frees the color b on the edges of the node by swapping the path of edge colors a and b starting at it,
+    # where a is missing on the node. Only the other end of the path changes its missing color, so the swap
+    # is done only when the end doesn't have the color it gets
+    def kempe_color(u):
+        used = neighbor_colors(u)
+        missing = [a for a in range(palette - 1) if a not in at[u]]
+        for b in range(palette - 1):
+            if b in used or b not in at[u]:
+                continue
+            for a in missing:
+                path = []
+                x, current = u, b
+                while current in at[x] and len(path) < MAX_PATH:
+                    e = at[x][current]
+                    path.append(e)
+                    x = ends[e][0] if ends[e][1] == x else ends[e][1]
+                    current = a if current == b else b
+                if current in at[x] or colors[x] == current:
+                    continue
+                for e in path:
+                    for y in ends[e]:
+                        del at[y][edge_colors[e]]
+                for e in path:
+                    edge_colors[e] = a if edge_colors[e] == b else b
+                    for y in ends[e]:
+                        at[y][edge_colors[e]] = e
+                colors[u] = b
+                return True
+        return False
+
+    remaining = []
+    for u in left:
+        neighbors = adjacent[offsets[u]:offsets[u + 1]]
+        for c in [c for c in range(palette) if c not in at[u]]:
+            moves = {}
+            for w in neighbors:
+                if colors[w] == c:
+                    used = neighbor_colors(w)
+                    moves[w] = next((d for d in range(palette) if d != c and d not in used and d not in at[w]), None)
+                    if moves[w] is None:
+                        break
+            else:
+                # The moved neighbors aren't adjacent to each other since they share the color c
+                for w, d in moves.items():
+                    colors[w] = d
+                colors[u] = c
+                break
+        else:
+            if not kempe_color(u):
+                remaining.append(u)
+
+    # The remaining nodes are colored greedily by the new colors
+    for u in remaining:
+        used = neighbor_colors(u)
+        c = palette
+        while c in used:
+            c += 1
+        colors[u] = c
+    return colors
+
+
+# Moves the elements of the highest color to lower colors free on them, while the whole color class can be moved,
+# neighbors are the elements of the total graph next to each element (total_local.total_neighbors)
+def compact(total, node_colors, edge_colors, neighbors):
+    n = total.n
+    colors = node_colors + edge_colors
+
+    colors_count = max(colors) + 1 if colors else 0
+    while colors_count > 1:
+        top = [x for x, c in enumerate(colors) if c == colors_count - 1]
+        for x in top:
+            used = {colors[y] for y in neighbors[x].tolist()}
+            c = next((c for c in range(colors_count - 1) if c not in used), None)
+            if c is None:
+                break
+            colors[x] = c
+        else:
+            colors_count -= 1
+            continue
+        # The class can't be emptied, the moves are kept since they are proper
+        break
+    return colors[:n], colors[n:]
+
+
+# Colors the graph by Misra-Gries edge coloring extended to the nodes, the coloring is optimal when it reaches
+# the lower bound of total_bounds, which is stored as graph.graph["lower_bound"] of the NetworkX graph
+# the graph is a NetworkX graph or TotalGraph, the colors are written to the NetworkX graph with write_back,
+# the times of the phases are measured in stats
+def total_coloring(graph, timeout=None, write_back=True, stats=None):
+    deadline = None if timeout is None else time.monotonic() + timeout
+    stats = Stats() if stats is None else stats
+    with stats.phase("encode"):
+        total = TotalGraph.of(graph)
+    with stats.phase("bounds"):
+        lower_bound = total_bounds.lower_bound(total)[0]
+    with stats.phase("solve"):
+        colors_count, node_colors, edge_colors = coloring(total, deadline)
+    with stats.phase("validate"):
+        if not total_validate.validate(node_colors, edge_colors, total.edges):
+            raise RuntimeError("Constructive coloring isn't proper")
+
+    with stats.phase("decode"):
+        total.assign(node_colors, edge_colors, "optimal" if colors_count <= lower_bound else "feasible", write_back)
+        if write_back and total.source is not None:
+            total.source.graph["lower_bound"] = lower_bound
+    return colors_count
+
+
+# Coloring of the TotalGraph, returns the amount of colors used and the colors of nodes and edges
+# the nodes which got new colors are repaired by tabu search with max_degree + 2 colors until the deadline
+def coloring(total, deadline=None):
+    # The edges use max_degree + 1 colors and one more color is free on every node
+    palette = total.max_degree + 2
+    edge_colors = edge_coloring(total)
+    node_colors = node_coloring(total, edge_colors, palette)
+    neighbors = total_local.total_neighbors(total)
+    if max(node_colors, default=0) >= palette:
+        left = sum(c >= palette for c in node_colors)
+        colors = total_local.tabu_search(neighbors, node_colors + edge_colors, palette,
+                                         REPAIR_ITERATIONS + 20 * left, deadline, random.Random(0))
+        if colors is not None:
+            node_colors, edge_colors = colors[:total.n].tolist(), colors[total.n:].tolist()
+    node_colors, edge_colors = compact(total, node_colors, edge_colors, neighbors)
+    colors_count = max(max(node_colors + edge_colors, default=-1) + 1, NULL_GRAPH_COLORS)
+    return colors_count, node_colors, edge_colors